@@ -0,0 +1,136 @@
+import contextvars
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from model_client import generate
+
+# Large assessments are generated as several smaller batches that run in
+# parallel, each seeded with a different slice of the syllabus and its own
+# question numbers so they do not repeat one another. Batches are merged,
+# near-duplicates dropped, and the result renumbered Q1..QN. If dedup leaves
+# too few questions, further batches top up the shortfall.
+BATCH_SIZE = 10
+MAX_CONCURRENCY = 4
+MAX_TOP_UP_ROUNDS = 2
+DUPLICATE_THRESHOLD = 0.8
+
+QUESTION_START = re.compile(r"^(\s*(?:\*\*)?\s*Q\s*)(\d+)(\s*[.):])", re.IGNORECASE)
+
+# --- 1. PROMPT ---
+def assessment_prompt(count, q_t, difficulty, context, start=1):
+    return (
+        f"Create {count} {q_t} questions at {difficulty} level based on the following context.\n\n"
+        f"STRICT FORMATTING RULES:\n"
+        f"1. ALWAYS bold the question text and number it clearly starting from Q{start} (e.g., **Q{start}. What is...?**).\n"
+        f"2. If generating MCQs, list each option (A, B, C, D) on a completely new line.\n"
+        f"3. ALWAYS bold the answer prefix and leave a blank line before it (e.g., **Correct Answer:**).\n"
+        f"4. If an answer contains a list, use bullet points (-) instead of numbers. Do NOT use numbers inside answers to prevent confusion with question numbers.\n"
+        f"5. Leave two blank lines between the end of an answer and the start of the next question.\n\n"
+        f"Context: {context}"
+    )
+
+# --- 2. PARSING ---
+def split_questions(text):
+    blocks, current = [], None
+    for line in text.splitlines():
+        if QUESTION_START.match(line):
+            if current is not None:
+                blocks.append("\n".join(current).strip())
+            current = [line]
+        elif current is not None:
+            current.append(line)
+    if current is not None:
+        blocks.append("\n".join(current).strip())
+    return blocks
+
+def _signature(block):
+    first = QUESTION_START.sub("", block.splitlines()[0])
+    return set(re.findall(r"[a-z0-9]+", first.lower()))
+
+def is_duplicate(sig, seen):
+    for other in seen:
+        union = sig | other
+        if union and len(sig & other) / len(union) >= DUPLICATE_THRESHOLD:
+            return True
+    return False
+
+def renumber(blocks):
+    out = []
+    for n, block in enumerate(blocks, 1):
+        m = QUESTION_START.match(block)
+        out.append(f"{m.group(1)}{n}{m.group(3)}{block[m.end():]}" if m else block)
+    return "\n\n\n".join(out)
+
+# --- 3. BATCH ENGINE ---
+def plan_batches(count, batch_size=BATCH_SIZE):
+    sizes = [batch_size] * (count // batch_size)
+    if count % batch_size:
+        sizes.append(count % batch_size)
+    return sizes
+
+def batch_contexts(index, focus, n_batches, budget_tokens):
+    # Spread the most relevant chunks round-robin so every batch sees different material
+    ids = index.select(focus, budget_tokens * n_batches)
+    groups = [ids[i::n_batches] or ids for i in range(n_batches)]
+    return ["\n...\n".join(index.chunks[i] for i in g) for g in groups]
+
+def _run_batch(n, size, start, q_t, difficulty, context, model_name, context_hash, cancel=None, refresh=False):
+    started = time.perf_counter()
+    if cancel is not None and cancel.is_set():
+        # Batches still waiting for a worker are skipped once the job is cancelled
+        return [], {"batch": n, "requested": size, "returned": 0, "seconds": 0.0, "error": "cancelled"}
+    try:
+        # The start number keeps batches that share a context from sending identical prompts
+        text = generate(assessment_prompt(size, q_t, difficulty, context, start), model_name, context_hash=context_hash,
+                        refresh=refresh)
+        # An unparseable response is kept whole rather than silently dropped
+        blocks, error = split_questions(text) or ([text.strip()] if text.strip() else []), None
+    except Exception as e:
+        blocks, error = [], str(e)
+    return blocks, {"batch": n, "requested": size, "returned": len(blocks),
+                    "seconds": round(time.perf_counter() - started, 3), "error": error}
+
+def _merge(blocks, kept, seen, count):
+    # Returns how many of blocks were new; stops once count questions are kept
+    added = 0
+    for block in blocks:
+        if len(kept) >= count:
+            break
+        sig = _signature(block)
+        if is_duplicate(sig, seen):
+            continue
+        seen.append(sig)
+        kept.append(block)
+        added += 1
+    return added
+
+def generate_assessment(count, q_t, difficulty, index, focus, budget_tokens, model_name,
+                        context_hash="", batch_size=BATCH_SIZE, max_concurrency=MAX_CONCURRENCY, cancel=None,
+                        refresh=False):
+    sizes = plan_batches(count, batch_size)
+    kept, seen, timings = [], [], []
+    start = 1
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(sizes)))) as pool:
+        for round_no in range(MAX_TOP_UP_ROUNDS + 1):
+            contexts = batch_contexts(index, focus, len(sizes), budget_tokens)
+            futures = []
+            for size, ctx in zip(sizes, contexts):
+                futures.append(pool.submit(contextvars.copy_context().run, _run_batch, len(timings) + len(futures) + 1,
+                                           size, start, q_t, difficulty, ctx, model_name, context_hash, cancel, refresh))
+                start += size
+            added = 0
+            # Merged in batch order, so the result does not depend on which batch finished first
+            for f in futures:
+                blocks, timing = f.result()
+                timing["kept"] = _merge(blocks, kept, seen, count)
+                added += timing["kept"]
+                timings.append(timing)
+            if cancel is not None and cancel.is_set():
+                return "", timings
+            # A round that added nothing would most likely be repeated verbatim
+            if len(kept) >= count or added == 0:
+                break
+            sizes = plan_batches(count - len(kept), batch_size)
+    if not kept and timings and all(t["error"] for t in timings):
+        raise RuntimeError(timings[0]["error"])
+    return renumber(kept), timings
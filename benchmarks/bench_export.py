@@ -0,0 +1,41 @@
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import export
+
+# Export time and peak Python memory against document length.
+# Run: python benchmarks/bench_export.py [pages ...]
+LINES_PER_PAGE = 30
+LINE = "Unit 3 - Thermodynamics: entropy, enthalpy and the second law — worked example • notes."
+
+def make_document(pages):
+    return "\n".join(f"{i + 1}. {LINE}" for i in range(pages * LINES_PER_PAGE))
+
+def bench(pages):
+    text = make_document(pages)
+    started = time.perf_counter()
+    data = export.render_pdf(text, "Benchmark")
+    render_s = time.perf_counter() - started
+    # Memory is measured on a separate run because tracemalloc distorts timings
+    tracemalloc.start()
+    export.render_pdf(text, "Benchmark")
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    export.create_pdf(text, "Benchmark")
+    started = time.perf_counter()
+    export.create_pdf(text, "Benchmark")
+    memo_s = time.perf_counter() - started
+    return len(text), len(data), render_s, peak, memo_s
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or [10, 50, 100, 250, 500]
+    font = export.unicode_font()
+    print(f"Font: {font[0] if font else 'built-in Times (Latin-1 fallback)'}")
+    print(f"{'pages':>6} {'chars':>10} {'pdf KB':>8} {'render s':>9} {'s/page':>8} {'peak MB':>8} {'memo ms':>8}")
+    for pages in sizes:
+        chars, size, render_s, peak, memo_s = bench(pages)
+        print(f"{pages:>6} {chars:>10} {size / 1024:>8.0f} {render_s:>9.2f} {render_s / pages:>8.4f} "
+              f"{peak / 1024 / 1024:>8.1f} {memo_s * 1000:>8.2f}")
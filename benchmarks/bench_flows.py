@@ -0,0 +1,241 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+# Headless benchmark of the generation flows against a deterministic fake
+# model, so caching and concurrency changes can be compared offline.
+# Every run works in a fresh temporary directory, so all caches start cold;
+# prompts and archive users include the syllabus size so sizes never share entries.
+# Each flow runs a cold pass (new prompts), a warm pass (the same prompts
+# again) and one extra traced operation for peak Python memory.
+# Run: python benchmarks/bench_flows.py --pages 10 100 1000 --latency 0.5
+MODEL = "gemini-2.5-flash"
+FLOW_ORDER = ["upload", "tutor", "assessment", "exam_paper", "lesson_plan", "slides", "archive", "export"]
+
+# Same budgets as the app's tabs
+TUTOR_CONTEXT_TOKENS = 1000
+ASSESS_CONTEXT_TOKENS = 1500
+EXAM_CONTEXT_TOKENS = 2000
+PLAN_CONTEXT_TOKENS = 1500
+SLIDES_CONTEXT_TOKENS = 1500
+TUTOR_CONVERSATIONS = 4
+
+TOPICS = ("Thermodynamics", "Kinematics", "Organic Chemistry", "Linear Algebra", "Data Structures",
+          "Operating Systems", "Microeconomics", "Cell Biology", "Probability", "Digital Logic",
+          "Fluid Mechanics", "Compiler Design", "Statistics", "Genetics", "Computer Networks")
+TERMS = ("definition", "derivation", "applications", "worked example", "laboratory", "case study",
+         "assignment", "tutorial", "revision", "problem set", "theorem", "algorithm", "model",
+         "analysis", "experiment", "reading", "seminar", "project", "quiz", "lecture")
+
+# --- 1. FIXTURES ---
+def make_syllabus_pdf(pages, seed=0):
+    from fpdf import FPDF
+    rng = random.Random(seed)
+    pdf = FPDF()
+    pdf.set_auto_page_break(False)
+    for page in range(pages):
+        pdf.add_page()
+        topic = rng.choice(TOPICS)
+        pdf.set_font("Times", 'B', 14)
+        pdf.cell(0, 10, f"Unit {page // 10 + 1}: {topic} (page {page + 1})", ln=True)
+        pdf.set_font("Times", size=10)
+        for line in range(40):
+            words = " ".join(rng.choice(TERMS) for _ in range(10))
+            pdf.cell(0, 6, f"{line + 1}. {topic} {words}", ln=True)
+    return pdf.output(dest='S').encode('latin-1')
+
+class Upload:
+    # The parts of Streamlit's UploadedFile the app uses
+    def __init__(self, name, data):
+        self.name = name
+        self.data = data
+
+    def getvalue(self):
+        return self.data
+
+# --- 2. FLOWS ---
+# Each flow is run(ctx, i) for one user-visible operation; i varies the prompt
+# so the cold pass misses every cache. setup(ctx, indices) runs untimed.
+def setup_upload(ctx, indices):
+    for i in indices:
+        if i not in ctx["pdfs"]:
+            ctx["pdfs"][i] = make_syllabus_pdf(ctx["pages"], seed=i + 1)
+
+def run_upload(ctx, i):
+    retrieval.get_index(pdf_cache.ingest_pdf(Upload(f"syllabus_{i}.pdf", ctx["pdfs"][i])))
+
+def run_tutor(ctx, i):
+    # One turn of an ongoing conversation; TUTOR_CONVERSATIONS users chat in parallel
+    conversation = ctx["conversations"][i % TUTOR_CONVERSATIONS]
+    question = f"Explain {TOPICS[i % len(TOPICS)]} with an example (question {i})"
+    answer = "".join(conversation.stream(question, ctx["index"], MODEL, TUTOR_CONTEXT_TOKENS, context_hash=ctx["doc_hash"]))
+    conversation.add_turn(question, answer, MODEL)
+
+def run_assessment(ctx, i):
+    tasks.run_assessment({"count": 20, "q_t": "MCQ", "difficulty": "Medium", "focus": f"{TOPICS[i % len(TOPICS)]} {i}",
+                          "budget": ASSESS_CONTEXT_TOKENS, "model": MODEL, "doc_hash": ctx["doc_hash"],
+                          "batch_size": 10, "max_concurrency": 4}, _no_progress, threading.Event())
+
+def run_exam_paper(ctx, i):
+    tasks.run_exam_paper({"paper_name": f"Final_Term_{i}", "e_mcq": 10, "e_fill": 5, "diff_a": "Easy",
+                          "e_mid": 5, "diff_b": "Moderate", "e_long": 3, "diff_c": "Difficult",
+                          "budget": EXAM_CONTEXT_TOKENS, "model": MODEL, "doc_hash": ctx["doc_hash"]},
+                         _no_progress, threading.Event())
+
+def run_lesson_plan(ctx, i):
+    tasks.run_lesson_plan({"plan_type": f"Weekly Plan {i}", "budget": PLAN_CONTEXT_TOKENS, "model": MODEL,
+                           "doc_hash": ctx["doc_hash"]}, _no_progress, threading.Event())
+
+def run_slides(ctx, i):
+    tasks.run_slides({"slide_topic": f"{TOPICS[i % len(TOPICS)]} overview {i}", "budget": SLIDES_CONTEXT_TOKENS,
+                      "model": MODEL, "doc_hash": ctx["doc_hash"]}, _no_progress, threading.Event())
+
+def run_archive(ctx, i):
+    # Save a generated item, then browse, search and open it as the Archive tab does
+    user = f"bench_{ctx['pages']}"
+    storage.save_material(user, "syllabus.pdf", f"{TOPICS[i % len(TOPICS)]} {i}", ctx["fake"].respond(f"archive {i}"), "Lesson Plan")
+    rows = storage.list_materials(user)
+    storage.search_materials(user, TOPICS[i % len(TOPICS)])
+    storage.load_material(user, rows[0][0])
+
+def run_export(ctx, i):
+    text = "\n".join(ctx["fake"].respond(f"export {ctx['pages']} {i} {n}") for n in range(20))
+    export.create_pdf(text, f"Lesson Plan {i}")
+
+def _no_progress(text):
+    pass
+
+FLOWS = {
+    "upload": (setup_upload, run_upload),
+    "tutor": (None, run_tutor),
+    "assessment": (None, run_assessment),
+    "exam_paper": (None, run_exam_paper),
+    "lesson_plan": (None, run_lesson_plan),
+    "slides": (None, run_slides),
+    "archive": (None, run_archive),
+    "export": (None, run_export),
+}
+
+# --- 3. HARNESS ---
+def percentile(values, q):
+    return float(np.percentile(values, q)) * 1000 if values else 0.0
+
+def timed_pass(ctx, run, indices, concurrency):
+    latencies, errors = [], 0
+    lock = threading.Lock()
+
+    def one(i):
+        nonlocal errors
+        started = time.perf_counter()
+        try:
+            run(ctx, i)
+        except Exception:
+            with lock:
+                errors += 1
+            raise
+        finally:
+            with lock:
+                latencies.append(time.perf_counter() - started)
+
+    calls = ctx["fake"].calls
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for fut in [pool.submit(one, i) for i in indices]:
+            fut.exception()
+    wall = time.perf_counter() - started
+    return {"ops": len(indices), "ops_per_s": len(indices) / wall if wall else 0.0, "wall_s": wall,
+            "p50_ms": percentile(latencies, 50), "p95_ms": percentile(latencies, 95),
+            "p99_ms": percentile(latencies, 99), "model_calls": ctx["fake"].calls - calls, "errors": errors}
+
+def traced_peak(ctx, run, i):
+    # Measured on a separate operation because tracemalloc distorts timings
+    tracemalloc.start()
+    try:
+        run(ctx, i)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def bench_flow(ctx, name, iterations, concurrency):
+    setup, run = FLOWS[name]
+    # Uploads are whole documents, so the cold pass uses a single fresh PDF
+    cold = list(range(1 if name == "upload" else iterations))
+    fresh = len(cold)
+    if setup:
+        setup(ctx, cold + [fresh])
+    rows = [("cold", timed_pass(ctx, run, cold, concurrency)),
+            ("warm", timed_pass(ctx, run, cold * (iterations // len(cold)), concurrency))]
+    peak = traced_peak(ctx, run, fresh)
+    for _, row in rows:
+        row["peak_mb"] = peak / 2 ** 20
+    return rows
+
+def prepare(pages, latency, response_words, token_latency, workers):
+    fake = fake_model.FakeModel(latency=latency, response_words=response_words, token_latency=token_latency)
+    model_client.set_backend(fake)
+    # Rate limits are lifted so the numbers reflect the app, not the quota
+    scheduler.set_scheduler(scheduler.Scheduler(requests_per_minute=10 ** 9, tokens_per_minute=10 ** 12, workers=workers))
+    storage.init_db()
+    started = time.perf_counter()
+    data = make_syllabus_pdf(pages)
+    generate_s = time.perf_counter() - started
+    doc_hash = pdf_cache.ingest_pdf(Upload("syllabus.pdf", data))
+    return {"pages": pages, "fake": fake, "doc_hash": doc_hash, "index": retrieval.get_index(doc_hash),
+            "conversations": [tutor.Conversation() for _ in range(TUTOR_CONVERSATIONS)], "pdfs": {}, "text_bytes": pdf_cache.document_info(doc_hash)["size_bytes"], "pdf_kb": len(data) / 1024,
+            "generate_s": generate_s}
+
+def print_rows(results):
+    print(f"{'pages':>6} {'flow':<12} {'pass':<5} {'ops':>4} {'ops/s':>8} {'p50 ms':>9} {'p95 ms':>9} "
+          f"{'p99 ms':>9} {'calls':>6} {'errors':>6} {'peak MB':>8}")
+    for pages, name, label, r in results:
+        print(f"{pages:>6} {name:<12} {label:<5} {r['ops']:>4} {r['ops_per_s']:>8.2f} {r['p50_ms']:>9.1f} "
+              f"{r['p95_ms']:>9.1f} {r['p99_ms']:>9.1f} {r['model_calls']:>6} {r['errors']:>6} {r['peak_mb']:>8.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100, 1000], help="synthetic syllabus sizes")
+    parser.add_argument("--flows", nargs="+", default=FLOW_ORDER, choices=FLOW_ORDER)
+    parser.add_argument("--iterations", type=int, default=8, help="operations per pass")
+    parser.add_argument("--concurrency", type=int, default=4, help="simultaneous users")
+    parser.add_argument("--latency", type=float, default=0.2, help="fake model seconds per call")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="fake model seconds per streamed word")
+    parser.add_argument("--response-words", type=int, default=300, help="fake model response size")
+    parser.add_argument("--model-workers", type=int, default=scheduler.WORKERS, help="scheduler workers")
+    args = parser.parse_args()
+
+    results = []
+    for pages in args.pages:
+        ctx = prepare(pages, args.latency, args.response_words, args.token_latency, args.model_workers)
+        print(f"{pages} pages: {ctx['pdf_kb']:.0f} KB PDF, {ctx['text_bytes']} text bytes, "
+              f"{len(ctx['index'].chunks)} chunks (generated in {ctx['generate_s']:.1f}s)", flush=True)
+        for name in args.flows:
+            for label, row in bench_flow(ctx, name, args.iterations, args.concurrency):
+                results.append((pages, name, label, row))
+    print()
+    print(f"Fake model: {args.latency}s/call, {args.token_latency}s/word, {args.response_words} words; "
+          f"{args.concurrency} concurrent users, {args.model_workers} scheduler workers")
+    print_rows(results)
+
+if __name__ == "__main__":
+    # Modules create their databases on import, relative to the working directory
+    os.chdir(tempfile.mkdtemp(prefix="bench_flows_"))
+    import export
+    import fake_model
+    import model_client
+    import pdf_cache
+    import retrieval
+    import scheduler
+    import storage
+    import tasks
+    import tutor
+    main()
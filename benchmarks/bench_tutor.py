@@ -0,0 +1,72 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Per-turn cost of a long Tutor conversation against the fake model: input
+# tokens, the share of each prompt that repeats the previous prompt's prefix
+# (what implicit context caching can reuse), reply latency and summary folds.
+# Folds run in the background in the app; here each one is awaited after the
+# reply is timed, so every turn sees a settled history.
+# Input tokens and reply latency should stay flat as the conversation grows.
+# Run: python benchmarks/bench_tutor.py --turns 60 --latency 0.05
+MODEL = "gemini-2.5-flash"
+QUESTIONS = ("What does {t} cover?", "Give an example for that.", "How is {t} assessed?",
+             "Explain the second point again.", "How does {t} relate to the previous unit?")
+
+def shared_prefix(a, b):
+    return len(os.path.commonprefix([a, b]))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=60)
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.05, help="fake model seconds per call")
+    parser.add_argument("--response-words", type=int, default=120, help="fake model answer size")
+    parser.add_argument("--every", type=int, default=5, help="print every Nth turn")
+    args = parser.parse_args()
+
+    fake = fake_model.FakeModel(latency=args.latency, response_words=args.response_words)
+    model_client.set_backend(fake)
+    scheduler.set_scheduler(scheduler.Scheduler(requests_per_minute=10 ** 9, tokens_per_minute=10 ** 12))
+    doc_hash = pdf_cache.ingest_pdf(bench_flows.Upload("syllabus.pdf", bench_flows.make_syllabus_pdf(args.pages)))
+    index = retrieval.get_index(doc_hash)
+
+    conv = tutor.Conversation()
+    previous, folds, rows = "", 0, []
+    print(f"{'turn':>5} {'input tok':>10} {'prefix reused':>14} {'history tok':>12} {'reply ms':>8} {'folds':>6}")
+    for turn in range(1, args.turns + 1):
+        topic = bench_flows.TOPICS[turn % len(bench_flows.TOPICS)]
+        question = QUESTIONS[turn % len(QUESTIONS)].format(t=topic) + f" ({turn})"
+        started = time.perf_counter()
+        calls = fake.calls
+        answer = "".join(conv.stream(question, index, MODEL, context_hash=doc_hash))
+        elapsed = (time.perf_counter() - started) * 1000
+        prompt = fake.prompts[-1]
+        conv.add_turn(question, answer, MODEL, wait=True)
+        folds += fake.calls - calls - 1
+        reused = shared_prefix(previous, prompt) / len(prompt)
+        previous = prompt
+        rows.append((retrieval.estimate_tokens(prompt), elapsed))
+        if turn == 1 or turn % args.every == 0:
+            print(f"{turn:>5} {rows[-1][0]:>10} {reused:>14.0%} {conv._turns_tokens(conv.turns):>12} {elapsed:>8.1f} {folds:>6}")
+    first, last = rows[:len(rows) // 4], rows[-(len(rows) // 4):]
+    if first and last:
+        avg = lambda xs, i: sum(x[i] for x in xs) / len(xs)
+        print(f"\nFirst quarter: {avg(first, 0):.0f} input tokens, {avg(first, 1):.1f} ms/turn; "
+              f"last quarter: {avg(last, 0):.0f} input tokens, {avg(last, 1):.1f} ms/turn")
+
+if __name__ == "__main__":
+    # Modules create their databases on import, relative to the working directory
+    os.chdir(tempfile.mkdtemp(prefix="bench_tutor_"))
+    import bench_flows
+    import fake_model
+    import model_client
+    import pdf_cache
+    import retrieval
+    import scheduler
+    import tutor
+    main()
@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+# The app modules create their databases on import, relative to the working
+# directory, so the tests run in a fresh temporary directory.
+collect_ignore = ["test_models.py"]  # needs a real API key
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.chdir(tempfile.mkdtemp(prefix="tests_"))
@@ -0,0 +1,108 @@
+import contextvars
+import re
+from concurrent.futures import ThreadPoolExecutor
+from model_client import generate
+
+# The exam paper is generated as independent parts (one per question type per
+# section) that run concurrently. Each part returns its questions plus its own
+# slice of the unit-coverage summary, so a malformed part is retried on its
+# own instead of regenerating the whole paper.
+SUMMARY_MARKER = "---SUMMARY---"
+MAX_ATTEMPTS = 3
+MAX_PARALLEL_PARTS = 4
+
+QUESTION_LINE = re.compile(r"^(\s*(?:\*\*)?\s*(?:Q\.?\s*)?)(\d+)(\s*[.):])", re.IGNORECASE)
+
+# --- 1. PLANNING ---
+def plan_parts(e_mcq, e_fill, diff_a, e_mid, diff_b, e_long, diff_c):
+    parts = [
+        ("A", "Section A: Objective Type (1 Mark Each)", "Multiple Choice Questions with options (A)-(D) each on a new line", e_mcq, diff_a),
+        ("A", "Section A: Objective Type (1 Mark Each)", "Fill-in-the-blank questions", e_fill, diff_a),
+        ("B", "Section B: Short Answer Type (3 Marks Each)", "short answer questions", e_mid, diff_b),
+        ("C", "Section C: Long Answer Type (5 Marks Each)", "long answer questions", e_long, diff_c),
+    ]
+    planned, starts = [], {}
+    for section, heading, kind, count, difficulty in parts:
+        if count <= 0:
+            continue
+        start = starts.get(section, 1)
+        starts[section] = start + count
+        planned.append({"section": section, "heading": heading, "kind": kind,
+                        "count": count, "difficulty": difficulty, "start": start})
+    return planned
+
+def part_prompt(paper_name, part, context):
+    return (
+        f"Act as a professional Academic Examiner writing part of the question paper '{paper_name}'.\n\n"
+        f"Write exactly {part['count']} {part['kind']} for {part['heading']}. DIFFICULTY: {part['difficulty']}.\n"
+        f"Number them {part['start']} to {part['start'] + part['count'] - 1}, one number per question.\n\n"
+        f"RULES:\n"
+        f"- Output only the questions. No answers, no section headings.\n"
+        f"- Use formal academic language.\n"
+        f"- After the last question, write '{SUMMARY_MARKER}' and list the syllabus Unit each question maps to, one line per question, using the same numbers.\n\n"
+        f"Syllabus Context: {context}"
+    )
+
+# --- 2. PARSING ---
+def renumber(text, start):
+    number = start
+    out = []
+    for line in text.splitlines():
+        m = QUESTION_LINE.match(line)
+        if m:
+            line = f"{m.group(1)}{number}{m.group(3)}{line[m.end():]}"
+            number += 1
+        out.append(line)
+    return "\n".join(out).strip(), number - start
+
+def parse_part(text, part):
+    questions, _, summary = text.partition(SUMMARY_MARKER)
+    questions, found = renumber(questions, part["start"])
+    summary, _ = renumber(summary, part["start"])
+    return questions, summary, found
+
+def is_complete(result, part):
+    return result[2] >= part["count"] and bool(result[1])
+
+# --- 3. GENERATION ---
+def generate_part(paper_name, part, context, model_name, context_hash, cancel=None, refresh=False):
+    prompt = part_prompt(paper_name, part, context)
+    result = ("", "", 0)
+    for attempt in range(MAX_ATTEMPTS):
+        # Parts and retries not yet started are skipped once the job is cancelled
+        if cancel is not None and cancel.is_set():
+            break
+        try:
+            # Only complete parts are cached; a retry skips the lookup and replaces the entry
+            text = generate(prompt, model_name, context_hash=context_hash, refresh=refresh or attempt > 0,
+                            accept=lambda t: is_complete(parse_part(t, part), part))
+        except Exception:
+            if attempt == MAX_ATTEMPTS - 1:
+                raise
+            continue
+        result = parse_part(text, part)
+        if is_complete(result, part):
+            break
+    return result
+
+def generate_exam_paper(paper_name, parts, context, model_name, context_hash="", cancel=None, refresh=False):
+    if not parts:
+        return "", "Unit analysis currently unavailable."
+    with ThreadPoolExecutor(max_workers=min(MAX_PARALLEL_PARTS, len(parts))) as pool:
+        futures = [pool.submit(contextvars.copy_context().run, generate_part, paper_name, p, context, model_name, context_hash, cancel, refresh)
+                   for p in parts]
+        results = [f.result() for f in futures]
+    if cancel is not None and cancel.is_set():
+        return "", ""
+
+    paper, summary, heading = [f"**{paper_name.replace('_', ' ')}**"], [], None
+    for part, (questions, part_summary, _) in zip(parts, results):
+        if part["heading"] != heading:
+            heading = part["heading"]
+            paper.append(f"\n**{heading}**")
+            summary.append(f"\n**{heading}**")
+        paper.append(questions)
+        if part_summary:
+            summary.append(part_summary)
+    unit_summary = "\n".join(summary).strip() if any(r[1] for r in results) else "Unit analysis currently unavailable."
+    return "\n".join(paper).strip(), unit_summary
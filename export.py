@@ -0,0 +1,146 @@
+import functools
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+import fpdf.fpdf
+from fpdf import FPDF
+import metrics
+
+# PDF export. Rendering happens only when a download is requested and output
+# is memoized by content hash, so reruns never rebuild documents. A Unicode
+# TTF is used when one is available; otherwise text falls back to Latin-1
+# with common typographic characters mapped rather than dropped.
+FONT_CANDIDATES = [
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "fonts", "DejaVuSans.ttf"),
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/dejavu/DejaVuSans.ttf",
+    "/Library/Fonts/DejaVuSans.ttf",
+    "C:\\Windows\\Fonts\\DejaVuSans.ttf",
+]
+MAX_MEMO_BYTES = 64 * 1024 * 1024
+
+LATIN1_FALLBACKS = {
+    "\u2018": "'", "\u2019": "'", "\u201c": '"', "\u201d": '"', "\u2013": "-", "\u2014": "-",
+    "\u2022": "-", "\u2026": "...", "\u00a0": " ", "\u2192": "->", "\u2264": "<=", "\u2265": ">=",
+}
+
+_memo = OrderedDict()
+_memo_bytes = 0
+_memo_lock = threading.Lock()
+
+# Font metrics are parsed once per process below, so fpdf's own pickle cache is
+# turned off; by default it writes .pkl files into the system font directory
+fpdf.fpdf.FPDF_CACHE_MODE = 1
+
+# --- 1. FONTS ---
+@functools.lru_cache(maxsize=1)
+def unicode_font():
+    # Resolved once per process; returns (regular_path, bold_path_or_None) or None
+    paths = [os.environ.get("PDF_FONT_PATH")] + FONT_CANDIDATES
+    for path in paths:
+        if path and os.path.isfile(path):
+            bold = path.replace("DejaVuSans.ttf", "DejaVuSans-Bold.ttf")
+            return path, bold if bold != path and os.path.isfile(bold) else None
+    return None
+
+@functools.lru_cache(maxsize=1)
+def _font_template():
+    # add_font(uni=True) parses the whole TTF for its metrics. That is done
+    # once, on a template document whose font tables every render copies.
+    font = unicode_font()
+    if not font:
+        return None
+    template = FPDF()
+    template.add_font("Body", "", font[0], uni=True)
+    # Each embedded face adds a fixed per-document cost, so the bold face is only used when installed
+    if font[1]:
+        template.add_font("Body", "B", font[1], uni=True)
+    return template
+
+def _add_unicode_fonts(pdf, template):
+    # Per-document state (the glyph subset, object numbers set on output) is copied;
+    # the parsed metrics are shared read-only
+    for key, font in template.fonts.items():
+        pdf.fonts[key] = dict(font, subset=list(font['subset']))
+    for key, info in template.font_files.items():
+        pdf.font_files[key] = dict(info)
+
+def to_latin1(text):
+    for src, dst in LATIN1_FALLBACKS.items():
+        text = text.replace(src, dst)
+    return text.encode('latin-1', 'ignore').decode('latin-1')
+
+# --- 2. RENDERING ---
+class _GlyphSubset(list):
+    # PyFPDF 1.7 appends every character it writes to a font's subset list and
+    # later scans that list once per glyph in the font, which makes output time
+    # grow with document length times font size. This keeps the list unique and
+    # gives it O(1) membership while preserving the list interface it relies on.
+    def __init__(self, items):
+        super().__init__(dict.fromkeys(items))
+        self._seen = set(self)
+
+    def append(self, item):
+        if item not in self._seen:
+            self._seen.add(item)
+            super().append(item)
+
+    def __contains__(self, item):
+        return item in self._seen
+
+    def __delitem__(self, index):
+        removed = self[index]
+        super().__delitem__(index)
+        self._seen = set(self) if isinstance(index, slice) else self._seen - {removed}
+
+def _dedupe_subsets(pdf):
+    for font in getattr(pdf, 'fonts', {}).values():
+        if type(font.get('subset')) is list:
+            font['subset'] = _GlyphSubset(font['subset'])
+
+def render_pdf(text, title):
+    pdf = FPDF()
+    template = _font_template()
+    if template:
+        _add_unicode_fonts(pdf, template)
+        family, title_style, clean = "Body", 'B' if "bodyB" in template.fonts else '', (lambda s: s)
+    else:
+        family, title_style, clean = "Times", 'B', to_latin1
+    _dedupe_subsets(pdf)
+    pdf.add_page()
+    pdf.set_font(family, title_style, 16)
+    pdf.cell(0, 10, clean(title.upper()), ln=True, align='C')
+    pdf.ln(10)
+    pdf.set_font(family, size=11)
+    # One multi_cell per line keeps line-breaking cost linear in document length
+    for line in clean(text).split("\n"):
+        if line.strip():
+            pdf.multi_cell(0, 8, txt=line)
+        else:
+            pdf.ln(8)
+    out = pdf.output(dest='S')
+    return out.encode('latin-1') if isinstance(out, str) else bytes(out)
+
+def content_key(text, title):
+    return hashlib.sha256(f"{title}\0{text}".encode('utf-8')).hexdigest()
+
+def create_pdf(text, title):
+    global _memo_bytes
+    key = content_key(text, title)
+    with _memo_lock:
+        if key in _memo:
+            _memo.move_to_end(key)
+            metrics.record("export.pdf", 0.0, prompt_chars=len(text), response_chars=len(_memo[key]), cache="hit")
+            return _memo[key]
+    with metrics.span("export.pdf", prompt_chars=len(text), cache="miss") as span:
+        data = render_pdf(text, title)
+        span["response_chars"] = len(data)
+    with _memo_lock:
+        if key not in _memo:
+            _memo[key] = data
+            _memo_bytes += len(data)
+            while _memo_bytes > MAX_MEMO_BYTES and len(_memo) > 1:
+                _, old = _memo.popitem(last=False)
+                _memo_bytes -= len(old)
+    return data
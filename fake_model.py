@@ -0,0 +1,76 @@
+import hashlib
+import re
+import threading
+import time
+
+# Deterministic stand-in for Gemini: same prompt -> same text, with a
+# configurable delay and response size. Plug it in with
+# model_client.set_backend(FakeModel()) to run the app offline. Prompts that
+# ask for N numbered questions get N well-formed questions (plus the summary
+# section the exam prompt asks for), so the parsers see realistic output.
+WORDS = ("syllabus unit topic concept theory practice example definition analysis "
+         "method principle outcome module lecture assessment").split()
+QUESTION_REQUEST = re.compile(r"(?:Create|exactly) (\d+) ")
+FIRST_NUMBER = re.compile(r"(?:starting from Q|Number them )(\d+)")
+SUMMARY_REQUEST = re.compile(r"write '(-{3}[A-Z]+-{3})'")
+
+class QuotaExceeded(Exception):
+    pass
+
+class FakeModel:
+    def __init__(self, latency=0.0, response_words=200, token_latency=0.0, fail_first=0):
+        self.latency = latency
+        self.fail_first = fail_first
+        self.response_words = response_words
+        self.token_latency = token_latency
+        self.calls = 0
+        self.prompts = []
+        self._lock = threading.Lock()
+
+    def __call__(self, model_name, prompt):
+        self._record(prompt)
+        if self.latency:
+            time.sleep(self.latency)
+        return self.respond(prompt)
+
+    def stream(self, model_name, prompt):
+        self._record(prompt)
+        if self.latency:
+            time.sleep(self.latency)  # time to first token
+        for i, word in enumerate(self.respond(prompt).split(" ")):
+            if self.token_latency:
+                time.sleep(self.token_latency)
+            yield word if i == 0 else " " + word
+
+    def _record(self, prompt):
+        # The first `fail_first` calls fail like a quota rejection, to exercise retries
+        with self._lock:
+            self.calls += 1
+            self.prompts.append(prompt)
+            failing = self.calls <= self.fail_first
+        if failing:
+            raise QuotaExceeded("429 Resource has been exhausted (e.g. check quota).")
+
+    def respond(self, prompt):
+        seed = hashlib.sha256(prompt.encode('utf-8')).digest()
+        words = [WORDS[seed[i % len(seed)] % len(WORDS)] for i in range(self.response_words)]
+        m = QUESTION_REQUEST.search(prompt)
+        if not m:
+            return " ".join(words)
+        return self._questions(prompt, int(m.group(1)), words)
+
+    def _questions(self, prompt, count, words):
+        first = FIRST_NUMBER.search(prompt)
+        start = int(first.group(1)) if first else 1
+        per = max(8, len(words) // max(count, 1))
+        out = []
+        for n in range(count):
+            q = words[n * per % len(words):][:per] or words[:per]
+            # A per-question tag keeps questions distinct for duplicate detection
+            tag = hashlib.sha256(f"{prompt}\0{n}".encode('utf-8')).hexdigest()[:8]
+            out.append(f"**Q{start + n}. {' '.join(q[:6])} {tag}?**\n\n**Correct Answer:** {' '.join(q[6:])}\n\n")
+        marker = SUMMARY_REQUEST.search(prompt)
+        if marker:
+            out.append(marker.group(1))
+            out.extend(f"{start + n}. Unit {n % 5 + 1}" for n in range(count))
+        return "\n".join(out)
@@ -0,0 +1,186 @@
+import json
+import os
+import socket
+import threading
+import uuid
+import time
+from concurrent.futures import ThreadPoolExecutor
+import metrics
+import storage
+
+# Long generations run on a process-wide worker pool and are tracked in a
+# SQLite jobs table, so they survive reruns and browser refreshes. The UI only
+# submits a job and polls its row.
+JOBS_DB = storage.DB_PATH
+JOB_WORKERS = 4
+PROGRESS_INTERVAL = 0.5
+HEARTBEAT_INTERVAL = 10.0
+# Active jobs whose owner has not sent a heartbeat for this long belong to a dead process
+OWNER_TIMEOUT = 3 * HEARTBEAT_INTERVAL
+# Identifies this process in the jobs table; the random part guards against pid reuse
+OWNER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+ACTIVE_STATES = (QUEUED, RUNNING)
+JOB_COLUMNS = ("id", "user", "kind", "payload", "state", "partial", "result", "error", "created", "started",
+               "finished", "owner", "heartbeat")
+
+HANDLERS = {}
+
+_cancel_events = {}
+_pool = None
+_pool_lock = threading.Lock()
+
+def handler(kind):
+    # Registers fn(payload, progress, cancel) -> result dict for a job kind.
+    # A result may carry an "archive" dict (topic, type, content) to be saved
+    # to the user's materials when the job finishes.
+    def register(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return register
+
+# --- 1. STORAGE ---
+def init_jobs():
+    conn = storage.connect(JOBS_DB)
+    with conn:
+        conn.execute('''CREATE TABLE IF NOT EXISTS jobs
+                        (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                         user TEXT, kind TEXT, payload TEXT,
+                         state TEXT, partial TEXT, result TEXT, error TEXT,
+                         created REAL, started REAL, finished REAL,
+                         owner TEXT, heartbeat REAL)''')
+        # Tables created before jobs had owners get the columns added in place
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(jobs)')}
+        for column, kind in (("owner", "TEXT"), ("heartbeat", "REAL")):
+            if column not in columns:
+                conn.execute(f'ALTER TABLE jobs ADD COLUMN {column} {kind}')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_user_kind ON jobs(user, kind, id)')
+    return conn
+
+init_jobs()
+
+def _execute(sql, params=()):
+    conn = storage.connect(JOBS_DB)
+    with conn:
+        return conn.execute(sql, params)
+
+def _row_to_job(row):
+    if row is None:
+        return None
+    job = dict(zip(JOB_COLUMNS, row))
+    job["payload"] = json.loads(job["payload"]) if job["payload"] else {}
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    return job
+
+def get_job(job_id):
+    c = storage.connect(JOBS_DB).cursor()
+    c.execute(f'SELECT {", ".join(JOB_COLUMNS)} FROM jobs WHERE id=?', (job_id,))
+    return _row_to_job(c.fetchone())
+
+def latest_job(user, kind):
+    c = storage.connect(JOBS_DB).cursor()
+    c.execute(f'SELECT {", ".join(JOB_COLUMNS)} FROM jobs WHERE user=? AND kind=? ORDER BY id DESC LIMIT 1', (user, kind))
+    return _row_to_job(c.fetchone())
+
+# --- 2. RUNNER ---
+# Every job row records the process that runs it. That process refreshes the
+# heartbeat of its active jobs, and takes over active jobs whose owner has
+# stopped beating. Other live processes sharing the database (replicas,
+# scripts) therefore never pick up each other's jobs.
+def start_workers():
+    # Called by the app once the handlers are registered (see main.py), never
+    # on import, so importing tasks from a script or worker claims no jobs
+    _get_pool()
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="job")
+            threading.Thread(target=_heartbeat_loop, args=(_pool,), daemon=True, name="job-heartbeat").start()
+        return _pool
+
+def _heartbeat_loop(pool):
+    while True:
+        try:
+            _execute('UPDATE jobs SET heartbeat=? WHERE owner=? AND state IN (?, ?)', (time.time(), OWNER) + ACTIVE_STATES)
+            reclaim_orphans(pool)
+        except Exception:
+            # A locked or busy database is retried on the next beat
+            pass
+        time.sleep(HEARTBEAT_INTERVAL)
+
+def reclaim_orphans(pool):
+    # Active jobs whose owner is dead are queued again under this process. The
+    # claim re-checks the heartbeat, so two processes never take the same job.
+    stale = time.time() - OWNER_TIMEOUT
+    c = storage.connect(JOBS_DB).cursor()
+    c.execute('SELECT id FROM jobs WHERE state IN (?, ?) AND COALESCE(heartbeat, 0) < ? ORDER BY id', ACTIVE_STATES + (stale,))
+    claimed = []
+    for (job_id,) in c.fetchall():
+        if _execute('UPDATE jobs SET state=?, owner=?, heartbeat=? WHERE id=? AND state IN (?, ?) AND COALESCE(heartbeat, 0) < ?',
+                    (QUEUED, OWNER, time.time(), job_id) + ACTIVE_STATES + (stale,)).rowcount:
+            _cancel_events[job_id] = threading.Event()
+            pool.submit(_run, job_id)
+            claimed.append(job_id)
+    return claimed
+
+def submit_job(user, kind, payload):
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    pool = _get_pool()
+    now = time.time()
+    c = _execute('INSERT INTO jobs (user, kind, payload, state, created, owner, heartbeat) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                 (user, kind, json.dumps(payload), QUEUED, now, OWNER, now))
+    job_id = c.lastrowid
+    _cancel_events[job_id] = threading.Event()
+    pool.submit(_run, job_id)
+    return job_id
+
+def cancel_job(job_id):
+    event = _cancel_events.get(job_id)
+    if event is not None:
+        event.set()
+    _execute('UPDATE jobs SET state=?, finished=? WHERE id=? AND state IN (?, ?)',
+             (CANCELLED, time.time(), job_id) + ACTIVE_STATES)
+
+def _run(job_id):
+    cancel = _cancel_events.setdefault(job_id, threading.Event())
+    job = get_job(job_id)
+    if job is None or job["state"] != QUEUED or job["owner"] != OWNER or cancel.is_set():
+        _cancel_events.pop(job_id, None)
+        return
+    if _execute('UPDATE jobs SET state=?, started=? WHERE id=? AND state=? AND owner=?',
+                (RUNNING, time.time(), job_id, QUEUED, OWNER)).rowcount == 0:
+        _cancel_events.pop(job_id, None)
+        return
+    last = [0.0]
+
+    def progress(text):
+        # Partial output is written at most every PROGRESS_INTERVAL seconds
+        now = time.monotonic()
+        if now - last[0] >= PROGRESS_INTERVAL:
+            last[0] = now
+            _execute('UPDATE jobs SET partial=? WHERE id=? AND owner=?', (text, job_id, OWNER))
+
+    # Spans recorded while the job runs are attributed to the tab that submitted it
+    metrics.set_tab(job["kind"])
+    metrics.record("job.wait", (time.time() - job["created"]) * 1000, kind=job["kind"])
+    try:
+        with metrics.span(f"job.{job['kind']}"):
+            result = HANDLERS[job["kind"]](job["payload"], progress, cancel)
+        if cancel.is_set():
+            return
+        # The guards keep a job cancelled while it was finishing cancelled, and
+        # leave a job taken over by another process to that process
+        finished = _execute('UPDATE jobs SET state=?, result=?, partial=NULL, finished=? WHERE id=? AND state=? AND owner=?',
+                            (DONE, json.dumps(result), time.time(), job_id, RUNNING, OWNER)).rowcount
+        if finished and result.get("archive"):
+            archive = result["archive"]
+            storage.save_material(job["user"], job["payload"].get("file_name", ""), archive["topic"], archive["content"], archive["type"])
+    except Exception as e:
+        _execute('UPDATE jobs SET state=?, error=?, finished=? WHERE id=? AND state=? AND owner=?',
+                 (FAILED, str(e), time.time(), job_id, RUNNING, OWNER))
+    finally:
+        _cancel_events.pop(job_id, None)
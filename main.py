@@ -1,52 +1,25 @@
 import streamlit as st
 import google.generativeai as genai
-from pypdf import PdfReader
 import time
-import sqlite3
-import io
-from gtts import gTTS
-import hashlib
-from fpdf import FPDF
+import os
+import metrics
+from tts import iter_segments, get_engine as get_tts_engine
+from export import create_pdf, content_key
 import random 
 import re
+from pdf_cache import ingest_pdf
+from retrieval import get_index, memory_stats
+from tutor import Conversation
+from scheduler import ModelBusyError, get_scheduler
+import jobs
+import tasks  # registers the generation job handlers
+from jobs import submit_job
+from storage import ARCHIVE_PAGE_SIZE, init_db, add_user, login_user, list_materials, search_materials, load_material
 
 # --- 1. DATABASE & AUTH ---
-def init_db():
-    conn = sqlite3.connect('study_data.db', check_same_thread=False)
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS materials 
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT, 
-                  user TEXT, file_name TEXT, topic TEXT, 
-                  content TEXT, type TEXT, 
-                  timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''')
-    c.execute('''CREATE TABLE IF NOT EXISTS users (username TEXT PRIMARY KEY, password TEXT)''')
-    conn.commit()
-    return conn
-
-conn = init_db()
-
-def make_hashes(password):
-    return hashlib.sha256(str.encode(password)).hexdigest()
-
-def add_user(username, password):
-    c = conn.cursor()
-    try:
-        c.execute('INSERT INTO users(username, password) VALUES (?,?)', (username, make_hashes(password)))
-        conn.commit()
-        return True
-    except: 
-        return False
-
-def login_user(username, password):
-    c = conn.cursor()
-    c.execute('SELECT * FROM users WHERE username =? AND password = ?', (username, make_hashes(password)))
-    return c.fetchall()
-
-def save_material(username, file_name, topic, content, m_type):
-    cursor = conn.cursor()
-    cursor.execute("INSERT INTO materials (user, file_name, topic, content, type) VALUES (?, ?, ?, ?, ?)", 
-                  (username, file_name, topic, content, m_type))
-    conn.commit()
+init_db()
+# Idempotent; starts the job workers and takes over jobs left by a dead process
+jobs.start_workers()
 
 # --- 2. HIGH-FIDELITY SaaS UI ---
 def apply_custom_design():
@@ -161,16 +134,93 @@ def apply_custom_design():
     """, unsafe_allow_html=True)
 
 # --- 3. UTILS ---
-def create_pdf(text, title):
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Times", 'B', 16)
-    pdf.cell(0, 10, title.upper(), ln=True, align='C')
-    pdf.ln(10)
-    pdf.set_font("Times", size=11)
-    clean_text = text.encode('latin-1', 'ignore').decode('latin-1')
-    pdf.multi_cell(0, 8, txt=clean_text)
-    return pdf.output(dest='S').encode('latin-1')
+JOB_POLL_SECONDS = 2
+ADMIN_USERS = {u.strip() for u in os.environ.get("ADMIN_USERS", "").split(",") if u.strip()}
+DASHBOARD_WINDOWS = {"Last hour": 3600, "Last 24 hours": 86400, "Last 7 days": 7 * 86400}
+
+def pdf_download(label, text, title, file_name, key):
+    # Nothing is rendered until the user asks for the PDF; after that it is served from the export memo
+    content = content_key(text, title)
+    if content not in st.session_state.prepared_pdfs:
+        if st.button("📄 Prepare PDF", key=f"prep_{key}"):
+            st.session_state.prepared_pdfs.add(content)
+            st.rerun()
+        return
+    st.download_button(label, create_pdf(text, title), file_name, key=f"dl_{key}")
+
+def stream_output(pieces, stop_key):
+    # Clicking Stop reruns the script, which closes the stream before anything is committed
+    stop_slot = st.empty()
+    stop_slot.button("⏹ Stop generating", key=stop_key)
+    out = st.empty()
+    text, last_paint = "", 0.0
+    for piece in pieces:
+        text += piece
+        if time.time() - last_paint > 0.05:
+            out.markdown(text + "▌")
+            last_paint = time.time()
+    out.empty()
+    stop_slot.empty()
+    return text
+
+def generate_clicked(label, kind, has_result):
+    # Returns (clicked, refresh). Regenerate asks the AI again instead of reusing the saved answer
+    if st.button(label, key=f"gen_{kind}"):
+        return True, False
+    if has_result and st.button("🔄 Regenerate", key=f"regen_{kind}", help="Ask the AI for a fresh version"):
+        return True, True
+    return False, False
+
+def current_job(kind):
+    # Falls back to the user's latest job of this kind, so a browser refresh reattaches to it
+    job_id = st.session_state.job_ids.get(kind)
+    return jobs.get_job(job_id) if job_id else jobs.latest_job(st.session_state.username, kind)
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def watch_job(job_id):
+    job = jobs.get_job(job_id)
+    if job["state"] not in jobs.ACTIVE_STATES:
+        st.rerun()
+    st.info(f"⏳ Job #{job_id} is {job['state']}. You can keep working; the result will appear here.")
+    if job["partial"]:
+        st.markdown(job["partial"] + "▌")
+    if st.button("⏹ Cancel", key=f"cancel_job_{job_id}"):
+        jobs.cancel_job(job_id)
+        st.rerun()
+
+def sync_job(kind, apply):
+    job = current_job(kind)
+    if job is None:
+        return
+    if job["state"] in jobs.ACTIVE_STATES:
+        watch_job(job["id"])
+    elif st.session_state.collected_jobs.get(kind) != job["id"]:
+        st.session_state.collected_jobs[kind] = job["id"]
+        if job["state"] == jobs.DONE:
+            apply(job["result"])
+        elif job["state"] == jobs.FAILED:
+            st.warning(job["error"])
+
+def performance_dashboard():
+    window = st.selectbox("Window", list(DASHBOARD_WINDOWS), key="perf_window")
+    report = metrics.summarize(DASHBOARD_WINDOWS[window])
+    if not report:
+        st.info("No timings recorded in this window yet.")
+    else:
+        st.dataframe(report, use_container_width=True, hide_index=True)
+    queue_stats = get_scheduler().stats()
+    cols = st.columns(4)
+    cols[0].metric("Queued", queue_stats["queued"])
+    cols[1].metric("Running", queue_stats["running"])
+    cols[2].metric("Retries", queue_stats["retries"])
+    cols[3].metric("Avg queue wait", f"{queue_stats['avg_wait_s']:.1f}s")
+    memory = memory_stats()
+    st.caption(f"📚 {memory['documents']} syllabi in memory · {memory['bytes'] / 2 ** 20:.0f} of "
+               f"{memory['limit_bytes'] / 2 ** 20:.0f} MB")
+    errors = metrics.recent_errors()
+    if errors:
+        st.caption("Recent errors")
+        st.dataframe(errors, use_container_width=True, hide_index=True)
 
 # --- 4. PAGE CONFIG ---
 st.set_page_config(page_title="AI Faculty Support System", page_icon="🎓", layout="wide")
@@ -179,10 +229,19 @@ apply_custom_design()
 # --- 5. SESSION STATE ---
 if "logged_in" not in st.session_state: st.session_state.logged_in = False
 if "username" not in st.session_state: st.session_state.username = ""
+# pdf_library maps file name -> document hash; the text itself lives in the shared store
 if "pdf_library" not in st.session_state: st.session_state.pdf_library = {} 
 if "active_pdf" not in st.session_state: st.session_state.active_pdf = None
 if "messages" not in st.session_state: st.session_state.messages = []
+if "tutor" not in st.session_state: st.session_state.tutor = Conversation()
 if "quiz_result" not in st.session_state: st.session_state.quiz_result = ""
+if "quiz_timings" not in st.session_state: st.session_state.quiz_timings = []
+if "job_ids" not in st.session_state: st.session_state.job_ids = {}
+if "collected_jobs" not in st.session_state: st.session_state.collected_jobs = {}
+if "archive_cursors" not in st.session_state: st.session_state.archive_cursors = [None]
+if "archive_last_query" not in st.session_state: st.session_state.archive_last_query = ""
+if "open_materials" not in st.session_state: st.session_state.open_materials = set()
+if "prepared_pdfs" not in st.session_state: st.session_state.prepared_pdfs = set()
 if "final_paper_content" not in st.session_state: st.session_state.final_paper_content = ""
 if "final_unit_summary" not in st.session_state: st.session_state.final_unit_summary = ""
 if "lesson_plan_result" not in st.session_state: st.session_state.lesson_plan_result = ""
@@ -213,6 +272,17 @@ else:
     # EXACT MODEL FROM YOUR ORIGINAL LOGS
     FINAL_MODEL_NAME = "gemini-2.5-flash"
 
+    # Context budgets (tokens) for the syllabus chunks each tool retrieves
+    TUTOR_CONTEXT_TOKENS = 1000
+    ASSESS_CONTEXT_TOKENS = 1500
+    EXAM_CONTEXT_TOKENS = 2000
+    PLAN_CONTEXT_TOKENS = 1500
+    SLIDES_CONTEXT_TOKENS = 1500
+
+    # Assessment batching: questions per request and parallel requests per click
+    ASSESS_BATCH_SIZE = 10
+    ASSESS_MAX_CONCURRENCY = 4
+
     # HERO HEADER
     greetings = ["Hello", "Namaste", "Jai Jagannath"]
     hero_html = """<div class="hero-container"><div class="hero-greeting-box">"""
@@ -223,68 +293,94 @@ else:
     <div style="font-size: 20px; color: white; opacity: 0.7; margin-top: 15px;">Professor {st.session_state.username}</div></div>"""
     st.markdown(hero_html, unsafe_allow_html=True)
 
+    is_admin = st.session_state.username in ADMIN_USERS
     with st.sidebar:
+        metrics.set_tab("sidebar")
         st.subheader("📁 Curriculum Upload")
         up_new = st.file_uploader("Upload Syllabus PDF", type="pdf")
         if up_new:
             if up_new.name not in st.session_state.pdf_library:
-                reader = PdfReader(up_new)
-                st.session_state.pdf_library[up_new.name] = "".join([p.extract_text() for p in reader.pages])
+                bar = st.progress(0.0, text="Reading syllabus...")
+                doc_hash = ingest_pdf(up_new, progress=lambda done, total: bar.progress(done / total, text=f"Reading page {done} of {total}..."))
+                st.session_state.pdf_library[up_new.name] = doc_hash
                 st.session_state.active_pdf = up_new.name
                 st.rerun()
         if st.session_state.pdf_library:
             st.session_state.active_pdf = st.selectbox("Switch PDF:", options=list(st.session_state.pdf_library.keys()))
+        queue_stats = get_scheduler().stats()
+        st.caption(f"⏳ AI queue: {queue_stats['queued']} waiting · avg wait {queue_stats['avg_wait_s']:.1f}s")
         if st.button("🚪 Logout"):
             st.session_state.logged_in = False
             st.rerun()
 
     if not st.session_state.active_pdf:
         st.info("Upload your curriculum syllabus in the sidebar to activate AI support tools.")
+        if is_admin:
+            with st.expander("📈 Performance"):
+                performance_dashboard()
     else:
-        current_text = st.session_state.pdf_library[st.session_state.active_pdf]
-        tabs = st.tabs(["💬 Tutor", "✍️ Assessment", "📜 Exam Paper", "📅 Lesson Plan", "📊 Slides", "🎧 Archive"])
+        doc_hash = st.session_state.pdf_library[st.session_state.active_pdf]
+        doc_index = get_index(doc_hash)
+        if doc_index is None:
+            # The shared store evicted this syllabus; the session only held its handle
+            st.session_state.pdf_library.pop(st.session_state.active_pdf)
+            st.session_state.active_pdf = None
+            st.warning("This syllabus is no longer cached. Please upload it again.")
+            st.stop()
+        tabs = st.tabs(["💬 Tutor", "✍️ Assessment", "📜 Exam Paper", "📅 Lesson Plan", "📊 Slides", "🎧 Archive"]
+                       + (["📈 Performance"] if is_admin else []))
 
         # Tab 1: Tutor
         with tabs[0]:
+            metrics.set_tab("tutor")
+            if st.session_state.messages and st.button("🧹 New conversation"):
+                st.session_state.messages = []
+                st.session_state.tutor = Conversation()
+                st.rerun()
             for m in st.session_state.messages:
                 with st.chat_message(m["role"]): st.write(m["content"])
             if pr := st.chat_input("Ask about the syllabus..."):
-                st.session_state.messages.append({"role": "user", "content": pr})
-                model = genai.GenerativeModel(FINAL_MODEL_NAME)
-                res = model.generate_content(f"Context: {current_text[:4000]}\nQ: {pr}")
-                st.session_state.messages.append({"role": "assistant", "content": res.text})
-                st.rerun()
+                with st.chat_message("user"): st.write(pr)
+                try:
+                    with st.chat_message("assistant"):
+                        answer = stream_output(st.session_state.tutor.stream(pr, doc_index, FINAL_MODEL_NAME, TUTOR_CONTEXT_TOKENS,
+                                                                             context_hash=doc_hash), "stop_tutor")
+                    st.session_state.messages.append({"role": "user", "content": pr})
+                    st.session_state.messages.append({"role": "assistant", "content": answer})
+                    st.session_state.tutor.add_turn(pr, answer, FINAL_MODEL_NAME)
+                except ModelBusyError as e:
+                    st.warning(str(e))
+                else:
+                    st.rerun()
 
         # Tab 2: Assessment Architect (FIXED FORMATTING FOR QUESTIONS & ANSWERS)
         with tabs[1]:
+            metrics.set_tab("assessment")
             st.subheader("Assessment Architect")
             col_a, col_b = st.columns(2)
             with col_a:
                 q_t = st.selectbox("Format", ["MCQ", "2-Mark Short Questions", "3-Mark Mid-Questions", "5-Mark Long Questions"])
                 diff_assess = st.select_slider("Difficulty Level", options=["Easy", "Medium", "Hard"], key="assess_diff")
                 count = st.number_input("Count", 1, 50, 10)
-                if st.button("Generate Questions"):
-                    with st.spinner("Generating highly structured assessment..."):
-                        model = genai.GenerativeModel(FINAL_MODEL_NAME)
-                        prompt = (
-                            f"Create {count} {q_t} questions at {diff_assess} level based on the following context.\n\n"
-                            f"STRICT FORMATTING RULES:\n"
-                            f"1. ALWAYS bold the question text and number it clearly (e.g., **Q1. What is...?**).\n"
-                            f"2. If generating MCQs, list each option (A, B, C, D) on a completely new line.\n"
-                            f"3. ALWAYS bold the answer prefix and leave a blank line before it (e.g., **Correct Answer:**).\n"
-                            f"4. If an answer contains a list, use bullet points (-) instead of numbers. Do NOT use numbers inside answers to prevent confusion with question numbers.\n"
-                            f"5. Leave two blank lines between the end of an answer and the start of the next question.\n\n"
-                            f"Context: {current_text[:6000]}"
-                        )
-                        res = model.generate_content(prompt)
-                        st.session_state.quiz_result = res.text
+                assess_focus = st.text_input("Focus Topic (optional)", key="assess_focus")
+                clicked, refresh = generate_clicked("Generate Questions", "assessment", bool(st.session_state.quiz_result))
+                if clicked:
+                    st.session_state.job_ids["assessment"] = submit_job(st.session_state.username, "assessment", {
+                        "count": count, "q_t": q_t, "difficulty": diff_assess, "focus": assess_focus,
+                        "budget": ASSESS_CONTEXT_TOKENS, "model": FINAL_MODEL_NAME, "doc_hash": doc_hash,
+                        "batch_size": ASSESS_BATCH_SIZE, "max_concurrency": ASSESS_MAX_CONCURRENCY, "refresh": refresh})
+                    st.rerun()
             with col_b:
+                sync_job("assessment", lambda res: st.session_state.update(quiz_result=res["text"], quiz_timings=res["timings"]))
                 if st.session_state.quiz_result:
                     st.markdown(st.session_state.quiz_result)
-                    st.download_button("💾 Export PDF", create_pdf(st.session_state.quiz_result, "Assessment"), "assessment.pdf")
+                    pdf_download("💾 Export PDF", st.session_state.quiz_result, "Assessment", "assessment.pdf", "assessment")
+                    with st.expander("⏱️ Batch timings"):
+                        st.table(st.session_state.quiz_timings)
 
         # Tab 3: Exam Paper Generator
         with tabs[2]:
+            metrics.set_tab("exam_paper")
             st.subheader("📜 Professional Exam Paper Generator")
             paper_name = st.text_input("Examination Name", value="Final_Term_Examination")
             st.markdown("---")
@@ -316,29 +412,15 @@ else:
                 diff_c = st.select_slider("Difficulty for Section C", options=levels, value="Difficult", key="diff_c")
 
             st.markdown("---")
-            if st.button("🚀 Generate Professional Exam Paper"):
-                with st.spinner("Analyzing curriculum and drafting sections..."):
-                    model = genai.GenerativeModel(FINAL_MODEL_NAME)
-                    full_prompt = (
-                        f"Act as a professional Academic Examiner. Create a formal question paper for '{paper_name}'.\n\n"
-                        f"SECTION A (1 Mark Each): {e_mcq} MCQs and {e_fill} Fill-ups. DIFFICULTY: {diff_a}. Start numbering from 1.\n"
-                        f"SECTION B (3 Marks Each): {e_mid} questions. DIFFICULTY: {diff_b}. Start numbering from 1.\n"
-                        f"SECTION C (5 Marks Each): {e_long} questions. DIFFICULTY: {diff_c}. Start numbering from 1.\n\n"
-                        f"RULES:\n"
-                        f"- Reset numbering for each section. No answers.\n"
-                        f"- Use formal academic language.\n"
-                        f"- At the end, write '---SUMMARY---' and provide a Teacher's Unit Coverage Summary showing Unit mapping for each question.\n\n"
-                        f"Syllabus Context: {current_text[:8000]}"
-                    )
-                    full_res = model.generate_content(full_prompt).text
-                    if "---SUMMARY---" in full_res:
-                        parts = full_res.split("---SUMMARY---")
-                        st.session_state.final_paper_content = parts[0].strip()
-                        st.session_state.final_unit_summary = parts[1].strip()
-                    else:
-                        st.session_state.final_paper_content = full_res
-                        st.session_state.final_unit_summary = "Unit analysis currently unavailable."
-                    st.rerun()
+            clicked, refresh = generate_clicked("🚀 Generate Professional Exam Paper", "exam_paper",
+                                                bool(st.session_state.final_paper_content))
+            if clicked:
+                st.session_state.job_ids["exam_paper"] = submit_job(st.session_state.username, "exam_paper", {
+                    "paper_name": paper_name, "e_mcq": e_mcq, "e_fill": e_fill, "diff_a": diff_a,
+                    "e_mid": e_mid, "diff_b": diff_b, "e_long": e_long, "diff_c": diff_c,
+                    "budget": EXAM_CONTEXT_TOKENS, "model": FINAL_MODEL_NAME, "doc_hash": doc_hash, "refresh": refresh})
+                st.rerun()
+            sync_job("exam_paper", lambda res: st.session_state.update(final_paper_content=res["paper"], final_unit_summary=res["summary"]))
 
             if st.session_state.final_paper_content:
                 st.markdown("#### 📄 University-Standard Paper Preview")
@@ -346,68 +428,94 @@ else:
                 st.markdown("---")
                 st.subheader("👨‍🏫 Teacher's Confidential Unit Guide")
                 st.markdown(f"<div class='unit-summary-box'>{st.session_state.final_unit_summary}</div>", unsafe_allow_html=True)
-                st.download_button("📥 Download Official PDF", create_pdf(st.session_state.final_paper_content, paper_name), f"{paper_name}.pdf")
+                pdf_download("📥 Download Official PDF", st.session_state.final_paper_content, paper_name, f"{paper_name}.pdf", "exam_paper")
 
         # Tab 4: Lesson Plan
         with tabs[3]:
+            metrics.set_tab("lesson_plan")
             st.subheader("Automated Lesson Planner")
             plan_type = st.radio("Select Plan Duration:", ["Weekly Plan", "Daily Plan"], horizontal=True)
             
-            if st.button("Create Planner"):
-                with st.spinner(f"Drafting Professional {plan_type}..."):
-                    model = genai.GenerativeModel(FINAL_MODEL_NAME)
-                    prompt = (
-                        f"Act as an expert Academic Curriculum Planner. Generate a professional {plan_type.lower()} for a teacher based on the syllabus below.\n\n"
-                        f"CRITICAL RULES:\n"
-                        f"1. Each teaching period is 40 minutes long. Break down the units logically so that the teacher does NOT cover an entire unit in one single period/day.\n"
-                        f"2. DO NOT output specific timestamps or minute-by-minute breakdowns (e.g., avoid writing '10 mins on X').\n"
-                        f"3. Structure the plan strictly 'Unit-wise' and then 'Topic-wise' for each teaching day.\n"
-                        f"4. For each topic/day, include a section called 'Extra Beneficial Topic' (such as industry insights, advanced concepts, or practical examples) that the teacher can use to provide extra value to the students.\n\n"
-                        f"Syllabus Context: {current_text[:6000]}"
-                    )
-                    res = model.generate_content(prompt)
-                    st.session_state.lesson_plan_result = res.text
-            
+            clicked, refresh = generate_clicked("Create Planner", "lesson_plan", bool(st.session_state.lesson_plan_result))
+            if clicked:
+                st.session_state.job_ids["lesson_plan"] = submit_job(st.session_state.username, "lesson_plan", {
+                    "plan_type": plan_type, "budget": PLAN_CONTEXT_TOKENS, "model": FINAL_MODEL_NAME,
+                    "doc_hash": doc_hash, "file_name": st.session_state.active_pdf, "refresh": refresh})
+                st.rerun()
+            sync_job("lesson_plan", lambda res: st.session_state.update(lesson_plan_result=res["text"]))
+
             if st.session_state.lesson_plan_result:
                 st.markdown(f"<div class='paper-preview-box'>{st.session_state.lesson_plan_result}</div>", unsafe_allow_html=True)
-                st.download_button(
-                    "📥 Download Lesson Plan (PDF)", 
-                    create_pdf(st.session_state.lesson_plan_result, f"Professional_{plan_type.replace(' ', '_')}"), 
-                    f"Lesson_Plan.pdf"
+                pdf_download(
+                    "📥 Download Lesson Plan (PDF)",
+                    st.session_state.lesson_plan_result, f"Professional_{plan_type.replace(' ', '_')}",
+                    "Lesson_Plan.pdf", "lesson_plan"
                 )
 
         # Tab 5: Slides 
         with tabs[4]:
+            metrics.set_tab("slides")
             st.subheader("Presentation Outliner")
             slide_topic = st.text_input("Topic Name:")
             
-            if st.button("Generate Slides"):
-                with st.spinner("Structuring presentation slides..."):
-                    model = genai.GenerativeModel(FINAL_MODEL_NAME)
-                    prompt = f"Create a professional slide presentation outline for the topic '{slide_topic}' based on this syllabus context: {current_text[:6000]}"
-                    res = model.generate_content(prompt)
-                    st.session_state.slide_result = res.text
-            
+            clicked, refresh = generate_clicked("Generate Slides", "slides", bool(st.session_state.slide_result))
+            if clicked:
+                st.session_state.job_ids["slides"] = submit_job(st.session_state.username, "slides", {
+                    "slide_topic": slide_topic, "budget": SLIDES_CONTEXT_TOKENS, "model": FINAL_MODEL_NAME,
+                    "doc_hash": doc_hash, "file_name": st.session_state.active_pdf, "refresh": refresh})
+                st.rerun()
+            sync_job("slides", lambda res: st.session_state.update(slide_result=res["text"]))
+
             if st.session_state.slide_result:
                 st.markdown(f"<div class='paper-preview-box'>{st.session_state.slide_result}</div>", unsafe_allow_html=True)
                 topic_filename = slide_topic.replace(' ', '_') if slide_topic else "Outline"
-                st.download_button(
-                    "📥 Download Slides Outline (PDF)", 
-                    create_pdf(st.session_state.slide_result, f"{topic_filename}_Slides"), 
-                    f"Slides_{topic_filename}.pdf"
+                pdf_download(
+                    "📥 Download Slides Outline (PDF)",
+                    st.session_state.slide_result, f"{topic_filename}_Slides",
+                    f"Slides_{topic_filename}.pdf", "slides"
                 )
 
         # Tab 6: Archive
         with tabs[5]:
+            metrics.set_tab("archive")
             st.subheader("Audio Study Archive")
-            c = conn.cursor()
-            c.execute("SELECT id, topic, content FROM materials WHERE user=? ORDER BY id DESC", (st.session_state.username,))
-            for r in c.fetchall():
-                with st.expander(f"📌 Archive {r[0]}"):
-                    st.write(r[2])
-                    if st.button(f"🔊 Listen", key=f"aud_{r[0]}"):
-                        tts = gTTS(r[2][:500], lang='en')
-                        af = io.BytesIO()
-                        tts.write_to_fp(af)
-                        af.seek(0)
-                        st.audio(af)
\ No newline at end of file
+            archive_query = st.text_input("🔍 Search your archive", key="archive_query")
+            if archive_query != st.session_state.archive_last_query:
+                st.session_state.archive_last_query = archive_query
+                st.session_state.archive_cursors = [None]
+            before_id = st.session_state.archive_cursors[-1]
+            if archive_query.strip():
+                rows = search_materials(st.session_state.username, archive_query, before_id, ARCHIVE_PAGE_SIZE)
+            else:
+                rows = list_materials(st.session_state.username, before_id, ARCHIVE_PAGE_SIZE)
+            if not rows:
+                st.info("No saved materials found.")
+            for m_id, m_topic, m_type, m_time in rows:
+                with st.expander(f"📌 {m_type} · {m_topic} · {m_time}"):
+                    # The body is only fetched once the user asks for it
+                    if m_id not in st.session_state.open_materials:
+                        if st.button("📖 Open", key=f"open_{m_id}"):
+                            st.session_state.open_materials.add(m_id)
+                            st.rerun()
+                        continue
+                    content = load_material(st.session_state.username, m_id)
+                    st.write(content)
+                    if st.button(f"🔊 Listen", key=f"aud_{m_id}"):
+                        engine = get_tts_engine()
+                        for audio in iter_segments(content, lang='en', engine=engine):
+                            st.audio(audio, format=engine.mime)
+            col_prev, col_next = st.columns(2)
+            with col_prev:
+                if len(st.session_state.archive_cursors) > 1 and st.button("⬅️ Newer"):
+                    st.session_state.archive_cursors.pop()
+                    st.rerun()
+            with col_next:
+                if len(rows) == ARCHIVE_PAGE_SIZE and st.button("Older ➡️"):
+                    st.session_state.archive_cursors.append(rows[-1][0])
+                    st.rerun()
+
+        # Tab 7: Performance (admins only)
+        if is_admin:
+            with tabs[6]:
+                metrics.set_tab("performance")
+                performance_dashboard()
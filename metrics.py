@@ -0,0 +1,126 @@
+import contextvars
+import json
+import queue
+import threading
+import time
+from contextlib import contextmanager
+import numpy as np
+import storage
+
+# Lightweight timing spans for every expensive operation (PDF parsing,
+# retrieval, model calls, exports, TTS, archive queries). Spans are queued in
+# memory and written to a local SQLite sink in batches by a background thread,
+# so recording costs microseconds on the request path.
+METRICS_DB = 'metrics.db'
+FLUSH_INTERVAL = 1.0
+FLUSH_BATCH = 500
+RETENTION_DAYS = 14
+
+current_tab = contextvars.ContextVar("current_tab", default=None)
+
+_queue = queue.Queue()
+_writer = None
+_writer_lock = threading.Lock()
+
+# --- 1. SINK ---
+def init_metrics():
+    conn = storage.connect(METRICS_DB)
+    with conn:
+        conn.execute('''CREATE TABLE IF NOT EXISTS spans
+                        (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                         ts REAL, op TEXT, tab TEXT, duration_ms REAL,
+                         ok INTEGER, error TEXT, prompt_chars INTEGER,
+                         response_chars INTEGER, cache TEXT, extra TEXT)''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_spans_ts ON spans(ts)')
+    return conn
+
+def _flush(rows):
+    conn = storage.connect(METRICS_DB)
+    with conn:
+        conn.executemany('''INSERT INTO spans (ts, op, tab, duration_ms, ok, error, prompt_chars,
+                            response_chars, cache, extra) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''', rows)
+
+def _write_loop():
+    init_metrics()
+    last_prune = 0.0
+    while True:
+        rows = [_queue.get()]
+        deadline = time.monotonic() + FLUSH_INTERVAL
+        while len(rows) < FLUSH_BATCH:
+            try:
+                rows.append(_queue.get(timeout=max(0.0, deadline - time.monotonic())))
+            except queue.Empty:
+                break
+        try:
+            _flush(rows)
+            if time.time() - last_prune > 3600:
+                last_prune = time.time()
+                conn = storage.connect(METRICS_DB)
+                with conn:
+                    conn.execute('DELETE FROM spans WHERE ts < ?', (time.time() - RETENTION_DAYS * 86400,))
+        except Exception:
+            # Metrics must never take the app down; a failed batch is dropped
+            pass
+
+def _ensure_writer():
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = threading.Thread(target=_write_loop, daemon=True, name="metrics-writer")
+                _writer.start()
+
+# --- 2. RECORDING ---
+def record(op, duration_ms, ok=True, error=None, tab=None, prompt_chars=None,
+           response_chars=None, cache=None, **extra):
+    _ensure_writer()
+    _queue.put((time.time(), op, tab or current_tab.get(), duration_ms, int(ok), error,
+                prompt_chars, response_chars, cache, json.dumps(extra) if extra else None))
+
+@contextmanager
+def span(op, **attrs):
+    # Callers may fill in attrs (cache, response_chars, ...) on the yielded dict
+    started = time.perf_counter()
+    try:
+        yield attrs
+    except GeneratorExit:
+        # A streaming consumer went away (e.g. the user pressed Stop); not an error
+        attrs.setdefault("cancelled", True)
+        raise
+    except BaseException as e:
+        attrs.setdefault("error", f"{type(e).__name__}: {e}"[:500])
+        attrs["ok"] = False
+        raise
+    finally:
+        record(op, (time.perf_counter() - started) * 1000, **attrs)
+
+def set_tab(name):
+    current_tab.set(name)
+
+# --- 3. REPORTING ---
+def summarize(since_seconds=3600):
+    since = time.time() - since_seconds
+    c = init_metrics().cursor()
+    c.execute('SELECT op, tab, duration_ms, ok, cache FROM spans WHERE ts >= ? ORDER BY op, tab', (since,))
+    groups = {}
+    for op, tab_name, duration, ok, cache in c.fetchall():
+        groups.setdefault((op, tab_name or "-"), []).append((duration, ok, cache))
+    report = []
+    for (op, tab_name), rows in sorted(groups.items()):
+        durations = np.array([r[0] for r in rows])
+        cached = [r[2] for r in rows if r[2]]
+        report.append({
+            "operation": op, "tab": tab_name, "calls": len(rows),
+            "per_min": round(len(rows) / (since_seconds / 60), 2),
+            "p50_ms": round(float(np.percentile(durations, 50)), 1),
+            "p95_ms": round(float(np.percentile(durations, 95)), 1),
+            "error_rate": round(1 - sum(r[1] for r in rows) / len(rows), 3),
+            "cache_hit_rate": round(cached.count("hit") / len(cached), 3) if cached else None,
+        })
+    return report
+
+def recent_errors(limit=20):
+    c = init_metrics().cursor()
+    c.execute('SELECT ts, op, tab, error FROM spans WHERE ok=0 ORDER BY id DESC LIMIT ?', (limit,))
+    return [{"time": time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(ts)), "operation": op, "tab": t, "error": e}
+            for ts, op, t, e in c.fetchall()]
@@ -0,0 +1,185 @@
+import hashlib
+import itertools
+import re
+import threading
+import time
+from concurrent.futures import Future
+import metrics
+import scheduler
+import storage
+
+# Every generate_content call goes through here. Responses are cached on disk
+# by (model, normalized prompt, context hash), and identical calls that are
+# already in flight (e.g. two sessions clicking the same preset) share one
+# upstream request.
+RESPONSE_DB = 'response_cache.db'
+CACHE_TTL_SECONDS = 7 * 24 * 3600
+MAX_CACHE_ENTRIES = 5000
+OUTPUT_TOKEN_ALLOWANCE = 1000
+
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+# --- 1. BACKENDS ---
+# The SDK is imported on first use so offline runs with a fake backend do not need it
+def gemini_backend(model_name, prompt):
+    import google.generativeai as genai
+    return genai.GenerativeModel(model_name).generate_content(prompt).text
+
+def gemini_stream_backend(model_name, prompt):
+    import google.generativeai as genai
+    for chunk in genai.GenerativeModel(model_name).generate_content(prompt, stream=True):
+        if chunk.parts:
+            yield chunk.text
+
+_backend = gemini_backend
+_stream_backend = gemini_stream_backend
+
+def set_backend(backend):
+    # A backend is any callable (model_name, prompt) -> text, e.g. fake_model.FakeModel.
+    # If it also has a stream(model_name, prompt) method yielding text pieces,
+    # generate_stream() uses it; otherwise the full response is yielded at once.
+    global _backend, _stream_backend
+    _backend = backend
+    _stream_backend = getattr(backend, 'stream', None)
+
+# --- 2. RESPONSE CACHE ---
+def init_cache():
+    conn = storage.connect(RESPONSE_DB)
+    with conn:
+        conn.execute('''CREATE TABLE IF NOT EXISTS responses
+                        (key TEXT PRIMARY KEY, model TEXT, response TEXT,
+                         created REAL, last_used REAL)''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used)')
+    return conn
+
+init_cache()
+
+def normalize_prompt(prompt):
+    return re.sub(r"\s+", " ", prompt).strip()
+
+def cache_key(model_name, prompt, context_hash=""):
+    raw = "\0".join([model_name, normalize_prompt(prompt), context_hash or ""])
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+def cache_get(key):
+    now = time.time()
+    conn = storage.connect(RESPONSE_DB)
+    c = conn.cursor()
+    c.execute('SELECT response, created FROM responses WHERE key=?', (key,))
+    row = c.fetchone()
+    if row is None:
+        return None
+    with conn:
+        if now - row[1] > CACHE_TTL_SECONDS:
+            conn.execute('DELETE FROM responses WHERE key=?', (key,))
+            return None
+        conn.execute('UPDATE responses SET last_used=? WHERE key=?', (now, key))
+    return row[0]
+
+def cache_put(key, model_name, response):
+    now = time.time()
+    conn = storage.connect(RESPONSE_DB)
+    with conn:
+        conn.execute('INSERT OR REPLACE INTO responses (key, model, response, created, last_used) VALUES (?, ?, ?, ?, ?)',
+                     (key, model_name, response, now, now))
+        conn.execute('DELETE FROM responses WHERE created < ?', (now - CACHE_TTL_SECONDS,))
+        conn.execute('''DELETE FROM responses WHERE key IN
+                        (SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)''', (MAX_CACHE_ENTRIES,))
+
+# --- 3. GENERATION ---
+def estimate_call_tokens(prompt):
+    return len(prompt) // 4 + OUTPUT_TOKEN_ALLOWANCE
+
+def _open_stream(model_name, prompt):
+    # Pulls the first piece inside the scheduler so the upstream request itself
+    # is rate limited and retried; the rest is read by the caller.
+    upstream = iter(_stream_backend(model_name, prompt))
+    try:
+        first = next(upstream)
+    except StopIteration:
+        return None, upstream
+    return first, upstream
+
+def generate(prompt, model_name, context_hash="", use_cache=True, priority=scheduler.BULK,
+             refresh=False, accept=None):
+    # refresh skips the cache lookup but still stores the new response, replacing
+    # any earlier one. accept(text) -> bool decides whether a response may be
+    # cached at all, so malformed output is never served again.
+    with metrics.span("model.generate", prompt_chars=len(prompt), model=model_name) as span:
+        text, span["cache"] = _generate(prompt, model_name, context_hash, use_cache, priority, refresh, accept)
+        span["response_chars"] = len(text)
+    return text
+
+def _generate(prompt, model_name, context_hash, use_cache, priority, refresh=False, accept=None):
+    # Returns (text, cache outcome); "shared" means another caller's in-flight request was reused
+    key = cache_key(model_name, prompt, context_hash)
+    if use_cache and not refresh:
+        cached = cache_get(key)
+        if cached is not None:
+            return cached, "hit"
+    # Single-flight: the first caller for a key runs the request, later
+    # callers for the same key wait on its result instead of re-billing.
+    with _inflight_lock:
+        fut = _inflight.get(key)
+        leader = fut is None
+        if leader:
+            fut = Future()
+            _inflight[key] = fut
+    if not leader:
+        return fut.result(), "shared"
+    try:
+        text = scheduler.get_scheduler().call(_backend, model_name, prompt, priority=priority,
+                                              tokens=estimate_call_tokens(prompt))
+        if use_cache and (accept is None or accept(text)):
+            cache_put(key, model_name, text)
+        fut.set_result(text)
+        return text, ("refresh" if refresh else "miss") if use_cache else None
+    except Exception as e:
+        fut.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+def generate_stream(prompt, model_name, context_hash="", cancel=None, use_cache=True, priority=scheduler.BULK,
+                    refresh=False):
+    # Yields text pieces as they arrive. Only a stream that runs to the end is
+    # cached; setting `cancel` (a threading.Event) or closing the generator
+    # abandons the upstream response.
+    started = time.perf_counter()
+    with metrics.span("model.stream", prompt_chars=len(prompt), model=model_name, response_chars=0) as span:
+        for piece in _generate_stream(prompt, model_name, context_hash, cancel, use_cache, priority, span, refresh):
+            if "first_piece_ms" not in span:
+                span["first_piece_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            span["response_chars"] += len(piece)
+            yield piece
+
+def _generate_stream(prompt, model_name, context_hash, cancel, use_cache, priority, span, refresh=False):
+    key = cache_key(model_name, prompt, context_hash)
+    if use_cache:
+        cached = None if refresh else cache_get(key)
+        if cached is not None:
+            span["cache"] = "hit"
+            yield cached
+            return
+        span["cache"] = "refresh" if refresh else "miss"
+    if _stream_backend is None:
+        yield generate(prompt, model_name, context_hash=context_hash, use_cache=use_cache, priority=priority,
+                       refresh=refresh)
+        return
+    first, upstream = scheduler.get_scheduler().call(_open_stream, model_name, prompt, priority=priority,
+                                                     tokens=estimate_call_tokens(prompt))
+    pieces = []
+    try:
+        for piece in itertools.chain([first] if first is not None else [], upstream):
+            if cancel is not None and cancel.is_set():
+                span["cancelled"] = True
+                return
+            pieces.append(piece)
+            yield piece
+    finally:
+        close = getattr(upstream, 'close', None)
+        if close: close()
+    if use_cache:
+        cache_put(key, model_name, "".join(pieces))
@@ -0,0 +1,185 @@
+import hashlib
+import threading
+import time
+from concurrent.futures import Future
+import metrics
+import storage
+from pdf_extract import iter_pages
+
+# Extracted page text is cached by a hash of the PDF bytes, so re-uploading a
+# known syllabus (from any account, after any restart) skips parsing entirely.
+# This is the shared document store: sessions keep only the hash, and page
+# text is read from the memory-mapped database only to build an index.
+CACHE_DB = 'pdf_cache.db'
+MAX_CACHE_BYTES = 512 * 1024 * 1024
+MMAP_BYTES = MAX_CACHE_BYTES
+STORE_BATCH_PAGES = 32
+
+_ingesting = {}
+_ingest_lock = threading.Lock()
+
+# --- 1. STORAGE ---
+def _connect():
+    return storage.connect(CACHE_DB, mmap_bytes=MMAP_BYTES)
+
+def init_cache():
+    conn = _connect()
+    with conn:
+        conn.execute('''CREATE TABLE IF NOT EXISTS documents
+                        (hash TEXT PRIMARY KEY, file_name TEXT,
+                         page_count INTEGER, size_bytes INTEGER,
+                         last_used REAL)''')
+        conn.execute('''CREATE TABLE IF NOT EXISTS pages
+                        (hash TEXT, page_no INTEGER, text TEXT,
+                         PRIMARY KEY (hash, page_no))''')
+        conn.execute('''CREATE TABLE IF NOT EXISTS indexes
+                        (hash TEXT PRIMARY KEY, chunks TEXT, vocab TEXT, arrays BLOB,
+                         size_bytes INTEGER)''')
+        if 'size_bytes' not in {row[1] for row in conn.execute('PRAGMA table_info(indexes)')}:
+            conn.execute('ALTER TABLE indexes ADD COLUMN size_bytes INTEGER')
+            conn.execute('UPDATE indexes SET size_bytes = LENGTH(chunks) + LENGTH(vocab) + LENGTH(arrays)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_documents_last_used ON documents(last_used)')
+    return conn
+
+init_cache()
+
+def file_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+def document_info(doc_hash):
+    c = _connect().cursor()
+    c.execute('SELECT file_name, page_count, size_bytes FROM documents WHERE hash=?', (doc_hash,))
+    row = c.fetchone()
+    return dict(zip(("file_name", "page_count", "size_bytes"), row)) if row else None
+
+def is_complete(doc_hash):
+    # False for unknown documents and for ones whose pages were lost, e.g. to
+    # a writer that failed after another one had committed the document row
+    c = _connect().cursor()
+    c.execute('''SELECT d.page_count = (SELECT COUNT(*) FROM pages p WHERE p.hash = d.hash)
+                 FROM documents d WHERE d.hash=?''', (doc_hash,))
+    row = c.fetchone()
+    return bool(row and row[0])
+
+def load_pages(doc_hash):
+    conn = _connect()
+    c = conn.cursor()
+    c.execute('SELECT page_count FROM documents WHERE hash=?', (doc_hash,))
+    row = c.fetchone()
+    if row is None:
+        return None
+    c.execute('SELECT text FROM pages WHERE hash=? ORDER BY page_no', (doc_hash,))
+    pages = [r[0] for r in c.fetchall()]
+    if len(pages) != row[0]:
+        return None
+    with conn:
+        conn.execute('UPDATE documents SET last_used=? WHERE hash=?', (time.time(), doc_hash))
+    return pages
+
+def store_pages(doc_hash, file_name, pages):
+    # pages may be a lazy iterable: text is written in small transactions as it
+    # arrives, so neither the whole document nor a long write lock is ever held.
+    # The document only becomes visible once its row is written at the end.
+    count, size = 0, 0
+    batch = []
+    conn = _connect()
+
+    def flush():
+        with conn:
+            conn.executemany('INSERT INTO pages (hash, page_no, text) VALUES (?, ?, ?)', batch)
+        batch.clear()
+
+    try:
+        with conn:
+            conn.execute('DELETE FROM documents WHERE hash=?', (doc_hash,))
+            conn.execute('DELETE FROM pages WHERE hash=?', (doc_hash,))
+        for text in pages:
+            batch.append((doc_hash, count, text))
+            count += 1
+            size += len(text.encode('utf-8'))
+            if len(batch) >= STORE_BATCH_PAGES:
+                flush()
+        flush()
+    except BaseException:
+        with conn:
+            conn.execute('DELETE FROM pages WHERE hash=?', (doc_hash,))
+        raise
+    with conn:
+        conn.execute('INSERT OR REPLACE INTO documents (hash, file_name, page_count, size_bytes, last_used) VALUES (?, ?, ?, ?, ?)',
+                     (doc_hash, file_name, count, size, time.time()))
+        _evict(conn, MAX_CACHE_BYTES, keep=doc_hash)
+
+def load_index_row(doc_hash):
+    c = _connect().cursor()
+    c.execute('SELECT chunks, vocab, arrays FROM indexes WHERE hash=?', (doc_hash,))
+    return c.fetchone()
+
+def store_index_row(doc_hash, chunks, vocab, arrays):
+    # The index holds a second copy of the text, so it counts towards the cache
+    # size; chunks is ASCII-only JSON and vocab is [a-z0-9], so len() is bytes
+    conn = _connect()
+    with conn:
+        conn.execute('INSERT OR REPLACE INTO indexes (hash, chunks, vocab, arrays, size_bytes) VALUES (?, ?, ?, ?, ?)',
+                     (doc_hash, chunks, vocab, arrays, len(chunks) + len(vocab) + len(arrays)))
+        _evict(conn, MAX_CACHE_BYTES, keep=doc_hash)
+
+def _evict(conn, max_bytes, keep=None):
+    # Least-recently-used documents go first; the one just stored is never evicted.
+    # A document's size is its page text plus its persisted index.
+    c = conn.cursor()
+    c.execute('SELECT (SELECT COALESCE(SUM(size_bytes), 0) FROM documents) + (SELECT COALESCE(SUM(size_bytes), 0) FROM indexes)')
+    total = c.fetchone()[0]
+    if total <= max_bytes:
+        return
+    c.execute('''SELECT d.hash, d.size_bytes + COALESCE(i.size_bytes, 0) FROM documents d
+                 LEFT JOIN indexes i ON i.hash = d.hash ORDER BY d.last_used ASC''')
+    for doc_hash, size in c.fetchall():
+        if total <= max_bytes:
+            break
+        if doc_hash == keep:
+            continue
+        c.execute('DELETE FROM pages WHERE hash=?', (doc_hash,))
+        c.execute('DELETE FROM indexes WHERE hash=?', (doc_hash,))
+        c.execute('DELETE FROM documents WHERE hash=?', (doc_hash,))
+        total -= size
+
+# --- 2. EXTRACTION ---
+def ingest_pdf(uploaded_file, progress=None):
+    # Returns the document handle (its content hash); the text stays on disk
+    data = uploaded_file.getvalue()
+    with metrics.span("pdf.extract", file_bytes=len(data)) as span:
+        doc_hash = file_hash(data)
+        # Single-flight: sessions uploading the same syllabus at once wait for one parse
+        with _ingest_lock:
+            fut = _ingesting.get(doc_hash)
+            leader = fut is None
+            if leader:
+                fut = _ingesting[doc_hash] = Future()
+        if leader:
+            try:
+                span["cache"] = _ingest(doc_hash, getattr(uploaded_file, 'name', ''), data, progress)
+            except Exception as e:
+                with _ingest_lock:
+                    _ingesting.pop(doc_hash, None)
+                fut.set_exception(e)
+                raise
+            with _ingest_lock:
+                _ingesting.pop(doc_hash, None)
+            fut.set_result(doc_hash)
+        else:
+            fut.result()
+            span["cache"] = "shared"
+        info = document_info(doc_hash)
+        span["pages"] = info["page_count"]
+        span["text_bytes"] = info["size_bytes"]
+    return doc_hash
+
+def _ingest(doc_hash, file_name, data, progress):
+    # Returns the cache outcome; an incomplete entry is parsed and stored again
+    if is_complete(doc_hash):
+        conn = _connect()
+        with conn:
+            conn.execute('UPDATE documents SET last_used=? WHERE hash=?', (time.time(), doc_hash))
+        return "hit"
+    store_pages(doc_hash, file_name, (text for _, text in iter_pages(data, progress=progress)))
+    return "miss"
@@ -0,0 +1,81 @@
+import io
+import multiprocessing
+import os
+import sys
+import threading
+import types
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from pypdf import PdfReader
+
+# Pages are parsed in worker processes, each holding its own PdfReader over the
+# raw bytes. The caller only ever sees (page_no, text) pairs, in page order.
+PAGES_PER_TASK = 8
+PARALLEL_MIN_PAGES = 24
+MAX_WORKERS = max(1, min(4, (os.cpu_count() or 1)))
+# The app process already runs scheduler, job and metrics threads, which a
+# forked child would inherit mid-operation, so workers are started fresh
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+_reader = None
+_main_lock = threading.Lock()
+
+def _init_worker(data):
+    global _reader
+    _reader = PdfReader(io.BytesIO(data))
+
+def _extract_range(start, stop):
+    return [(i, _reader.pages[i].extract_text() or "") for i in range(start, stop)]
+
+@contextmanager
+def _without_app_main():
+    # A new worker imports the parent's __main__ by path when it has a __file__.
+    # Under Streamlit that is the app script, which would then run in every
+    # worker (database setup, job recovery), so workers start against a stub.
+    with _main_lock:
+        main = sys.modules['__main__']
+        sys.modules['__main__'] = types.ModuleType('__main__')
+        try:
+            yield
+        finally:
+            sys.modules['__main__'] = main
+
+def _submit(pool, *args):
+    # Workers are started on demand inside submit(), so every submit is covered
+    with _without_app_main():
+        return pool.submit(_extract_range, *args)
+
+def _iter_serial(reader, progress):
+    total = len(reader.pages)
+    for i in range(total):
+        text = reader.pages[i].extract_text() or ""
+        if progress: progress(i + 1, total)
+        yield i, text
+
+def iter_pages(data, progress=None, workers=MAX_WORKERS):
+    # Small documents are not worth a pool start-up; parse them in-process.
+    reader = PdfReader(io.BytesIO(data))
+    total = len(reader.pages)
+    if workers <= 1 or total < PARALLEL_MIN_PAGES:
+        yield from _iter_serial(reader, progress)
+        return
+    # Only the page count was needed here; the workers parse the document themselves
+    del reader
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(data,),
+                             mp_context=multiprocessing.get_context(START_METHOD)) as pool:
+        ranges = [(s, min(s + PAGES_PER_TASK, total)) for s in range(0, total, PAGES_PER_TASK)]
+        # Only a bounded window of ranges is in flight, so finished-but-unread
+        # page text never piles up ahead of a slow consumer.
+        window = workers * 2
+        pending = [_submit(pool, s, e) for s, e in ranges[:window]]
+        next_range = len(pending)
+        done = 0
+        while pending:
+            batch = pending.pop(0).result()
+            if next_range < len(ranges):
+                pending.append(_submit(pool, *ranges[next_range]))
+                next_range += 1
+            for page_no, text in batch:
+                done += 1
+                if progress: progress(done, total)
+                yield page_no, text
@@ -0,0 +1,208 @@
+import io
+import json
+import os
+import re
+import sys
+import threading
+from concurrent.futures import Future
+from collections import Counter, OrderedDict
+import numpy as np
+import metrics
+import pdf_cache
+
+# BM25 over fixed-size syllabus chunks. The index is built once per uploaded
+# PDF, persisted next to its cached page text, and queried fully offline.
+# Loaded indexes are shared by every session on the same syllabus and kept in
+# a per-process LRU bounded by INDEX_MEMORY_MB.
+CHUNK_CHARS = 800
+K1 = 1.5
+B = 0.75
+MAX_MEMORY_BYTES = int(os.environ.get("INDEX_MEMORY_MB", 256)) * 1024 * 1024
+
+STOPWORDS = set("""a an and are as at be by for from has have in is it its of on or that the
+this to was were will with which what who how why when where do does can""".split())
+
+_memo = OrderedDict()
+_memo_bytes = 0
+_memo_lock = threading.Lock()
+_loading = {}
+
+# --- 1. TEXT ---
+def estimate_tokens(text):
+    return len(text) // 4 + 1
+
+def tokenize(text):
+    return [t for t in re.findall(r"[a-z0-9]+", text.lower()) if t not in STOPWORDS and len(t) > 1]
+
+def chunk_text(text, size=CHUNK_CHARS):
+    # Lines are packed into chunks so that sentences from one heading stay together.
+    chunks, buf, length = [], [], 0
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        while len(line) > size:
+            if buf:
+                chunks.append("\n".join(buf))
+                buf, length = [], 0
+            cut = line.rfind(" ", 0, size)
+            cut = cut if cut > 0 else size
+            chunks.append(line[:cut])
+            line = line[cut:].strip()
+        if length + len(line) > size and buf:
+            chunks.append("\n".join(buf))
+            buf, length = [], 0
+        buf.append(line)
+        length += len(line) + 1
+    if buf:
+        chunks.append("\n".join(buf))
+    return chunks
+
+# --- 2. INDEX ---
+class ChunkIndex:
+    def __init__(self, chunks, vocab, post_ptr, post_docs, post_tf, doc_len):
+        self.chunks = chunks
+        self.vocab = vocab
+        self.term_ids = {t: i for i, t in enumerate(vocab)}
+        self.post_ptr = post_ptr
+        self.post_docs = post_docs
+        self.post_tf = post_tf
+        self.doc_len = doc_len
+        n = len(chunks)
+        df = np.diff(post_ptr).astype(np.float64)
+        self.idf = np.log((n - df + 0.5) / (df + 0.5) + 1.0)
+        self.avg_len = float(doc_len.mean()) if n else 0.0
+        self.chunk_tokens = np.array([estimate_tokens(c) for c in chunks], dtype=np.int32)
+        self.nbytes = (sum(sys.getsizeof(c) for c in chunks) + sum(sys.getsizeof(t) for t in vocab)
+                       + sys.getsizeof(self.term_ids) + sum(a.nbytes for a in (
+                           post_ptr, post_docs, post_tf, doc_len, self.idf, self.chunk_tokens)))
+
+    @classmethod
+    def build(cls, text):
+        chunks = chunk_text(text)
+        counts = [Counter(tokenize(c)) for c in chunks]
+        vocab = sorted(set().union(*counts)) if counts else []
+        term_ids = {t: i for i, t in enumerate(vocab)}
+        # Postings are stored term-major (CSC layout) so a query only touches
+        # the chunks that actually contain its terms.
+        postings = [[] for _ in vocab]
+        for doc, cnt in enumerate(counts):
+            for term, tf in cnt.items():
+                postings[term_ids[term]].append((doc, tf))
+        post_ptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        post_ptr[1:] = np.cumsum([len(p) for p in postings])
+        post_docs = np.fromiter((d for p in postings for d, _ in p), dtype=np.int32, count=int(post_ptr[-1]))
+        post_tf = np.fromiter((f for p in postings for _, f in p), dtype=np.float32, count=int(post_ptr[-1]))
+        doc_len = np.array([sum(c.values()) for c in counts], dtype=np.float32)
+        return cls(chunks, vocab, post_ptr, post_docs, post_tf, doc_len)
+
+    def scores(self, query):
+        scores = np.zeros(len(self.chunks), dtype=np.float64)
+        for term in set(tokenize(query)):
+            t = self.term_ids.get(term)
+            if t is None:
+                continue
+            a, b = self.post_ptr[t], self.post_ptr[t + 1]
+            docs, tf = self.post_docs[a:b], self.post_tf[a:b]
+            norm = K1 * (1 - B + B * self.doc_len[docs] / self.avg_len)
+            scores[docs] += self.idf[t] * tf * (K1 + 1) / (tf + norm)
+        return scores
+
+    def coverage(self, budget_tokens):
+        # Evenly spaced chunks across the whole syllabus, for whole-course tasks.
+        n = len(self.chunks)
+        if n == 0:
+            return []
+        per_chunk = max(1, int(self.chunk_tokens.mean()))
+        take = max(1, min(n, budget_tokens // per_chunk))
+        return sorted(set(np.linspace(0, n - 1, take).round().astype(int).tolist()))
+
+    def select(self, query, budget_tokens):
+        ranked = []
+        if query and query.strip():
+            scores = self.scores(query)
+            ranked = [int(i) for i in np.argsort(-scores, kind='stable') if scores[i] > 0]
+        if not ranked:
+            ranked = self.coverage(budget_tokens)
+        picked, used = [], 0
+        for i in ranked:
+            cost = int(self.chunk_tokens[i])
+            if used + cost > budget_tokens:
+                if picked:
+                    continue
+                return [i]
+            picked.append(i)
+            used += cost
+        return sorted(picked)
+
+    def context(self, query, budget_tokens):
+        with metrics.span("retrieval.context", prompt_chars=len(query or "")) as span:
+            text = "\n...\n".join(self.chunks[i] for i in self.select(query, budget_tokens))
+            span["response_chars"] = len(text)
+        return text
+
+    def to_row(self):
+        buf = io.BytesIO()
+        np.savez_compressed(buf, post_ptr=self.post_ptr, post_docs=self.post_docs,
+                            post_tf=self.post_tf, doc_len=self.doc_len)
+        return json.dumps(self.chunks), "\n".join(self.vocab), buf.getvalue()
+
+    @classmethod
+    def from_row(cls, chunks_json, vocab, arrays):
+        data = np.load(io.BytesIO(arrays))
+        return cls(json.loads(chunks_json), vocab.split("\n") if vocab else [],
+                   data['post_ptr'], data['post_docs'], data['post_tf'], data['doc_len'])
+
+# --- 3. PERSISTENCE ---
+def load_index(doc_hash):
+    row = pdf_cache.load_index_row(doc_hash)
+    return ChunkIndex.from_row(*row) if row else None
+
+def _load_or_build(doc_hash, text):
+    index = load_index(doc_hash)
+    if index is None:
+        if text is None:
+            pages = pdf_cache.load_pages(doc_hash)
+            if pages is None:
+                return None
+            text = "".join(pages)
+        index = ChunkIndex.build(text)
+        pdf_cache.store_index_row(doc_hash, *index.to_row())
+    return index
+
+def get_index(doc_hash, text=None):
+    # Returns None once the document has been evicted from the page store.
+    # text is only read when the index has to be built.
+    global _memo_bytes
+    with _memo_lock:
+        if doc_hash in _memo:
+            _memo.move_to_end(doc_hash)
+            return _memo[doc_hash]
+        # Single-flight: concurrent sessions on one syllabus wait for a single load
+        fut = _loading.get(doc_hash)
+        leader = fut is None
+        if leader:
+            fut = _loading[doc_hash] = Future()
+    if not leader:
+        return fut.result()
+    try:
+        index = _load_or_build(doc_hash, text)
+    except Exception as e:
+        with _memo_lock:
+            _loading.pop(doc_hash, None)
+        fut.set_exception(e)
+        raise
+    with _memo_lock:
+        _loading.pop(doc_hash, None)
+        if index is not None:
+            _memo[doc_hash] = index
+            _memo_bytes += index.nbytes
+            while _memo_bytes > MAX_MEMORY_BYTES and len(_memo) > 1:
+                _, old = _memo.popitem(last=False)
+                _memo_bytes -= old.nbytes
+    fut.set_result(index)
+    return index
+
+def memory_stats():
+    with _memo_lock:
+        return {"documents": len(_memo), "bytes": _memo_bytes, "limit_bytes": MAX_MEMORY_BYTES}
@@ -0,0 +1,179 @@
+import heapq
+import itertools
+import queue
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+# One scheduler per process sits in front of every model call. Calls wait in a
+# priority queue (interactive Tutor questions ahead of bulk generation), are
+# admitted by request- and token-per-minute buckets, and quota/availability
+# errors are retried with exponential backoff and jitter.
+INTERACTIVE = 0
+BULK = 10
+
+REQUESTS_PER_MINUTE = 60
+TOKENS_PER_MINUTE = 1000000
+WORKERS = 4
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 30.0
+
+RETRYABLE_MARKERS = ("429", "quota", "resource exhausted", "resourceexhausted", "rate limit",
+                     "503", "unavailable", "deadline", "timed out", "500 internal")
+
+class ModelBusyError(RuntimeError):
+    pass
+
+# --- 1. RATE LIMITING ---
+class TokenBucket:
+    def __init__(self, per_minute, clock=time.monotonic):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = float(per_minute)
+        self.clock = clock
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay_for(self, amount):
+        # Seconds until `amount` is available; a request larger than the whole
+        # bucket waits for a full bucket rather than forever.
+        amount = min(amount, self.capacity)
+        with self.lock:
+            self._refill()
+            return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def consume(self, amount):
+        with self.lock:
+            self._refill()
+            self.level -= min(amount, self.capacity)
+
+def is_retryable(error):
+    text = f"{type(error).__name__} {error}".lower()
+    return any(m in text for m in RETRYABLE_MARKERS)
+
+def backoff_delay(attempt):
+    # Full jitter: uniform in [0, min(cap, base * 2^attempt)]
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+# --- 2. SCHEDULER ---
+class Scheduler:
+    def __init__(self, requests_per_minute=REQUESTS_PER_MINUTE, tokens_per_minute=TOKENS_PER_MINUTE,
+                 workers=WORKERS, max_retries=MAX_RETRIES, sleep=time.sleep):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.sleep = sleep
+        self.queue = queue.PriorityQueue()
+        self.seq = itertools.count()
+        # Calls backing off wait here, not in a worker, so they never hold up other calls
+        self.delayed = []
+        self.delayed_cv = threading.Condition()
+        self.stats_lock = threading.Lock()
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.retries = 0
+        self.last_wait = 0.0
+        self.avg_wait = 0.0
+        for _ in range(workers):
+            threading.Thread(target=self._worker, daemon=True).start()
+        threading.Thread(target=self._release_delayed, daemon=True).start()
+
+    def submit(self, fn, *args, priority=BULK, tokens=0):
+        fut = Future()
+        self.queue.put((priority, next(self.seq), fn, args, tokens, time.monotonic(), fut, 0))
+        return fut
+
+    def call(self, fn, *args, priority=BULK, tokens=0):
+        return self.submit(fn, *args, priority=priority, tokens=tokens).result()
+
+    def _admit(self, tokens):
+        while True:
+            delay = max(self.requests.delay_for(1), self.tokens.delay_for(tokens))
+            if delay <= 0:
+                self.requests.consume(1)
+                self.tokens.consume(tokens)
+                return
+            self.sleep(delay)
+
+    def _defer(self, item, delay):
+        with self.delayed_cv:
+            heapq.heappush(self.delayed, (time.monotonic() + delay, item[1], item))
+            self.delayed_cv.notify()
+
+    def _release_delayed(self):
+        # Moves each backed-off call back onto the priority queue once its not-before time has passed
+        with self.delayed_cv:
+            while True:
+                if not self.delayed:
+                    self.delayed_cv.wait()
+                    continue
+                wait = self.delayed[0][0] - time.monotonic()
+                if wait > 0:
+                    self.delayed_cv.wait(wait)
+                    continue
+                self.queue.put(heapq.heappop(self.delayed)[2])
+
+    def _worker(self):
+        while True:
+            item = self.queue.get()
+            priority, seq, fn, args, tokens, enqueued, fut, attempt = item
+            if attempt == 0 and not fut.set_running_or_notify_cancel():
+                continue
+            self._admit(tokens)
+            if attempt == 0:
+                wait = time.monotonic() - enqueued
+                with self.stats_lock:
+                    self.last_wait = wait
+                    self.avg_wait = wait if self.completed + self.failed == 0 else 0.9 * self.avg_wait + 0.1 * wait
+            with self.stats_lock:
+                self.running += 1
+            try:
+                fut.set_result(fn(*args))
+                with self.stats_lock:
+                    self.completed += 1
+            except BaseException as e:
+                if is_retryable(e) and attempt < self.max_retries:
+                    with self.stats_lock:
+                        self.retries += 1
+                    self._defer(item[:-1] + (attempt + 1,), backoff_delay(attempt))
+                    continue
+                if is_retryable(e):
+                    busy = ModelBusyError("The AI service is busy right now. Please try again in a minute.")
+                    busy.__cause__ = e
+                    e = busy
+                fut.set_exception(e)
+                with self.stats_lock:
+                    self.failed += 1
+            finally:
+                with self.stats_lock:
+                    self.running -= 1
+
+    def stats(self):
+        with self.stats_lock:
+            return {"queued": self.queue.qsize(), "running": self.running,
+                    "completed": self.completed, "failed": self.failed, "retries": self.retries,
+                    "backing_off": len(self.delayed),
+                    "last_wait_s": round(self.last_wait, 3), "avg_wait_s": round(self.avg_wait, 3)}
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def get_scheduler():
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = Scheduler()
+        return _scheduler
+
+def set_scheduler(scheduler):
+    global _scheduler
+    with _scheduler_lock:
+        _scheduler = scheduler
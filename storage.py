@@ -0,0 +1,161 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import zlib
+import metrics
+
+# Every module gets its SQLite connections from here: one connection per
+# thread per database file, in WAL mode so readers never block the writer and
+# concurrent writers wait on busy_timeout instead of failing with
+# "database is locked".
+DB_PATH = 'study_data.db'
+BUSY_TIMEOUT_MS = 15000
+
+# Material bodies live out of line in material_blobs, zlib-compressed above
+# this size, so archive listings only ever touch the small materials rows.
+COMPRESS_MIN_BYTES = 1024
+ARCHIVE_PAGE_SIZE = 20
+
+_local = threading.local()
+_initialized = set()
+_init_lock = threading.Lock()
+
+# --- 1. CONNECTIONS ---
+def connect(path=DB_PATH, mmap_bytes=0):
+    # mmap_bytes lets read-mostly stores serve pages from the OS page cache,
+    # shared by every connection and process, instead of private buffers
+    conns = getattr(_local, 'conns', None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(path)
+    if conn is None:
+        conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT_MS}')
+        if mmap_bytes:
+            conn.execute(f'PRAGMA mmap_size={int(mmap_bytes)}')
+        conns[path] = conn
+    return conn
+
+def init_db():
+    # Streamlit calls this on every rerun; the schema checks and the migration
+    # scan only need to run once per process for each database file
+    key = os.path.abspath(DB_PATH)
+    with _init_lock:
+        if key in _initialized:
+            return connect()
+        _create_schema()
+        _initialized.add(key)
+    return connect()
+
+def _create_schema():
+    conn = connect()
+    with conn:
+        conn.execute('''CREATE TABLE IF NOT EXISTS materials
+                        (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                         user TEXT, file_name TEXT, topic TEXT,
+                         content TEXT, type TEXT,
+                         timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''')
+        conn.execute('''CREATE TABLE IF NOT EXISTS users (username TEXT PRIMARY KEY, password TEXT)''')
+        # Archive queries are "WHERE user=? ORDER BY id DESC"; this makes them an index range scan
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_materials_user_id ON materials(user, id)')
+        conn.execute('''CREATE TABLE IF NOT EXISTS material_blobs
+                        (material_id INTEGER PRIMARY KEY, compressed INTEGER, data BLOB)''')
+        # Contentless FTS5 index: rowid is the material id, the text itself stays in material_blobs
+        conn.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS materials_fts
+                        USING fts5(topic, content, content='')''')
+    _migrate_inline_content(conn)
+
+def _migrate_inline_content(conn, batch=500):
+    # Rows saved before content moved out of line are converted once, in batches
+    while True:
+        rows = conn.execute('''SELECT id, topic, content FROM materials
+                               WHERE content IS NOT NULL AND content != '' LIMIT ?''', (batch,)).fetchall()
+        if not rows:
+            return
+        with conn:
+            for material_id, topic, content in rows:
+                _write_body(conn, material_id, topic, content)
+                conn.execute("UPDATE materials SET content='' WHERE id=?", (material_id,))
+
+# --- 2. AUTH ---
+def make_hashes(password):
+    return hashlib.sha256(str.encode(password)).hexdigest()
+
+def add_user(username, password):
+    conn = connect()
+    try:
+        with conn:
+            conn.execute('INSERT INTO users(username, password) VALUES (?,?)', (username, make_hashes(password)))
+        return True
+    except sqlite3.IntegrityError:
+        return False
+
+def login_user(username, password):
+    c = connect().cursor()
+    c.execute('SELECT * FROM users WHERE username =? AND password = ?', (username, make_hashes(password)))
+    return c.fetchall()
+
+# --- 3. MATERIALS ---
+def _write_body(conn, material_id, topic, content):
+    data = content.encode('utf-8')
+    compressed = len(data) >= COMPRESS_MIN_BYTES
+    conn.execute('INSERT OR REPLACE INTO material_blobs (material_id, compressed, data) VALUES (?, ?, ?)',
+                 (material_id, int(compressed), zlib.compress(data, 6) if compressed else data))
+    conn.execute('INSERT INTO materials_fts (rowid, topic, content) VALUES (?, ?, ?)', (material_id, topic, content))
+
+def save_materials(rows):
+    # rows: iterable of (username, file_name, topic, content, m_type), written in one transaction
+    conn = connect()
+    with metrics.span("db.save_materials"), conn:
+        for username, file_name, topic, content, m_type in rows:
+            c = conn.execute("INSERT INTO materials (user, file_name, topic, content, type) VALUES (?, ?, ?, '', ?)",
+                             (username, file_name, topic, m_type))
+            _write_body(conn, c.lastrowid, topic, content)
+
+def save_material(username, file_name, topic, content, m_type):
+    save_materials([(username, file_name, topic, content, m_type)])
+
+def list_materials(username, before_id=None, limit=ARCHIVE_PAGE_SIZE):
+    # Keyset pagination: pass the smallest id of the previous page as before_id
+    c = connect().cursor()
+    with metrics.span("db.list_materials"):
+        if before_id is None:
+            c.execute("SELECT id, topic, type, timestamp FROM materials WHERE user=? ORDER BY id DESC LIMIT ?",
+                      (username, limit))
+        else:
+            c.execute("SELECT id, topic, type, timestamp FROM materials WHERE user=? AND id<? ORDER BY id DESC LIMIT ?",
+                      (username, before_id, limit))
+        return c.fetchall()
+
+def search_materials(username, query, before_id=None, limit=ARCHIVE_PAGE_SIZE):
+    # Each word is quoted so user input cannot break FTS5 query syntax
+    terms = re.findall(r"\w+", query)
+    if not terms:
+        return list_materials(username, before_id, limit)
+    match = " ".join(f'"{t}"' for t in terms)
+    c = connect().cursor()
+    with metrics.span("db.search_materials", prompt_chars=len(query)):
+        c.execute('''SELECT m.id, m.topic, m.type, m.timestamp FROM materials_fts f
+                     JOIN materials m ON m.id = f.rowid
+                     WHERE materials_fts MATCH ? AND m.user=? AND m.id<?
+                     ORDER BY m.id DESC LIMIT ?''',
+                  (match, username, before_id if before_id is not None else 2 ** 63 - 1, limit))
+        return c.fetchall()
+
+def load_material(username, material_id):
+    c = connect().cursor()
+    with metrics.span("db.load_material"):
+        c.execute('''SELECT b.compressed, b.data, m.content FROM materials m
+                     LEFT JOIN material_blobs b ON b.material_id = m.id
+                     WHERE m.id=? AND m.user=?''', (material_id, username))
+        row = c.fetchone()
+    if row is None:
+        return None
+    compressed, data, inline = row
+    if data is None:
+        return inline or ""
+    return (zlib.decompress(data) if compressed else data).decode('utf-8')
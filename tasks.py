@@ -0,0 +1,68 @@
+import jobs
+from assessment import generate_assessment
+from exam_paper import plan_parts, generate_exam_paper
+from model_client import generate_stream
+from retrieval import get_index
+
+# Job handlers for the generation tabs. Payloads carry only settings and the
+# syllabus hash; the text and its index are loaded from the shared cache.
+# A payload with "refresh" set asks the model again and replaces cached answers.
+
+# --- 1. PROMPTS ---
+def lesson_plan_prompt(plan_type, context):
+    return (
+        f"Act as an expert Academic Curriculum Planner. Generate a professional {plan_type.lower()} for a teacher based on the syllabus below.\n\n"
+        f"CRITICAL RULES:\n"
+        f"1. Each teaching period is 40 minutes long. Break down the units logically so that the teacher does NOT cover an entire unit in one single period/day.\n"
+        f"2. DO NOT output specific timestamps or minute-by-minute breakdowns (e.g., avoid writing '10 mins on X').\n"
+        f"3. Structure the plan strictly 'Unit-wise' and then 'Topic-wise' for each teaching day.\n"
+        f"4. For each topic/day, include a section called 'Extra Beneficial Topic' (such as industry insights, advanced concepts, or practical examples) that the teacher can use to provide extra value to the students.\n\n"
+        f"Syllabus Context: {context}"
+    )
+
+def slides_prompt(slide_topic, context):
+    return f"Create a professional slide presentation outline for the topic '{slide_topic}' based on this syllabus context: {context}"
+
+# --- 2. HELPERS ---
+def load_index(doc_hash):
+    index = get_index(doc_hash)
+    if index is None:
+        raise RuntimeError("The syllabus is no longer cached. Please upload it again.")
+    return index
+
+def _stream_text(prompt, p, progress, cancel):
+    text = ""
+    for piece in generate_stream(prompt, p["model"], context_hash=p["doc_hash"], cancel=cancel,
+                                 refresh=p.get("refresh", False)):
+        text += piece
+        progress(text)
+    return text
+
+# --- 3. HANDLERS ---
+@jobs.handler("assessment")
+def run_assessment(p, progress, cancel):
+    text, timings = generate_assessment(
+        p["count"], p["q_t"], p["difficulty"], load_index(p["doc_hash"]), p["focus"], p["budget"], p["model"],
+        context_hash=p["doc_hash"], batch_size=p["batch_size"], max_concurrency=p["max_concurrency"], cancel=cancel,
+        refresh=p.get("refresh", False))
+    return {"text": text, "timings": timings}
+
+@jobs.handler("exam_paper")
+def run_exam_paper(p, progress, cancel):
+    parts = plan_parts(p["e_mcq"], p["e_fill"], p["diff_a"], p["e_mid"], p["diff_b"], p["e_long"], p["diff_c"])
+    context = load_index(p["doc_hash"]).context('', p["budget"])
+    paper, summary = generate_exam_paper(p["paper_name"], parts, context, p["model"], context_hash=p["doc_hash"], cancel=cancel,
+                                         refresh=p.get("refresh", False))
+    return {"paper": paper, "summary": summary}
+
+@jobs.handler("lesson_plan")
+def run_lesson_plan(p, progress, cancel):
+    context = load_index(p["doc_hash"]).context('', p["budget"])
+    text = _stream_text(lesson_plan_prompt(p["plan_type"], context), p, progress, cancel)
+    return {"text": text, "archive": {"topic": p["plan_type"], "type": "Lesson Plan", "content": text}}
+
+@jobs.handler("slides")
+def run_slides(p, progress, cancel):
+    context = load_index(p["doc_hash"]).context(p["slide_topic"], p["budget"])
+    text = _stream_text(slides_prompt(p["slide_topic"], context), p, progress, cancel)
+    return {"text": text, "archive": {"topic": p["slide_topic"] or "Outline", "type": "Slides", "content": text}}
@@ -0,0 +1,16 @@
+import pytest
+import fake_model
+import model_client
+import scheduler
+import storage
+
+@pytest.fixture
+def fake():
+    # Rate limits are lifted so the tests never wait on the quota
+    scheduler.set_scheduler(scheduler.Scheduler(requests_per_minute=10 ** 9, tokens_per_minute=10 ** 12))
+    model = fake_model.FakeModel(response_words=20)
+    model_client.set_backend(model)
+    conn = storage.connect(model_client.RESPONSE_DB)
+    with conn:
+        conn.execute('DELETE FROM responses')
+    return model
@@ -0,0 +1,63 @@
+import assessment
+import fake_model
+import model_client
+import retrieval
+
+def test_split_questions_keeps_answers():
+    text = "Intro line\n**Q1. What is heat?**\n\n**Correct Answer:** Energy\n\n\n**Q2. What is work?**\n(A) force"
+    blocks = assessment.split_questions(text)
+    assert blocks == ["**Q1. What is heat?**\n\n**Correct Answer:** Energy", "**Q2. What is work?**\n(A) force"]
+
+def test_assessment_renumber():
+    blocks = ["**Q5. One?**", "**Q9. Two?**", "Q 2) Three?"]
+    assert assessment.renumber(blocks) == "**Q1. One?**\n\n\n**Q2. Two?**\n\n\nQ 3) Three?"
+
+def test_is_duplicate():
+    seen = [assessment._signature("**Q1. What is the first law of thermodynamics?**")]
+    assert assessment.is_duplicate(assessment._signature("**Q7. What is the first law of thermodynamics**"), seen)
+    assert not assessment.is_duplicate(assessment._signature("**Q2. Define entropy?**"), seen)
+
+def test_plan_batches():
+    assert assessment.plan_batches(25, 10) == [10, 10, 5]
+    assert assessment.plan_batches(20, 10) == [10, 10]
+
+def topic_index():
+    # "Thermodynamics" appears in only two of the chunks
+    units = ["Thermodynamics entropy heat", "Thermodynamics work engines"] + [f"Unit {n} kinematics velocity" for n in range(8)]
+    return retrieval.ChunkIndex.build("\n".join(u + " " + "filler " * 110 for u in units))
+
+def test_batches_sharing_a_context_send_distinct_prompts(fake):
+    text, timings = assessment.generate_assessment(50, "MCQ", "Medium", topic_index(), "Thermodynamics", 300, "m",
+                                                   batch_size=10)
+    assert fake.calls == 5 and len(set(fake.prompts)) == 5
+    assert len(assessment.split_questions(text)) == 50
+    assert [t["kept"] for t in timings] == [10] * 5
+
+def repeating_backend(unique_per_batch):
+    # Answers every batch with unique_per_batch new questions, then one repeated question
+    calls = []
+
+    def backend(model_name, prompt):
+        calls.append(prompt)
+        size = int(fake_model.QUESTION_REQUEST.search(prompt).group(1))
+        start = int(fake_model.FIRST_NUMBER.search(prompt).group(1))
+        return "\n\n".join(f"**Q{start + k}. " + (f"Explain c{len(calls)}x{k}?**" if k < unique_per_batch else "What is heat?**")
+                             for k in range(size))
+
+    backend.calls = calls
+    return backend
+
+def test_shortfall_after_dedup_is_topped_up(fake):
+    backend = repeating_backend(5)
+    model_client.set_backend(backend)
+    text, timings = assessment.generate_assessment(20, "MCQ", "Medium", topic_index(), "", 300, "m", batch_size=10)
+    assert len(assessment.split_questions(text)) == 20
+    assert len(backend.calls) == 4
+    assert [t["kept"] for t in timings] == [6, 5, 5, 4]
+    assert [t["batch"] for t in timings] == [1, 2, 3, 4]
+
+def test_top_up_stops_when_nothing_new(fake):
+    model_client.set_backend(lambda model_name, prompt: "**Q1. The same question?**")
+    text, timings = assessment.generate_assessment(20, "MCQ", "Medium", topic_index(), "", 300, "m", batch_size=10)
+    assert len(assessment.split_questions(text)) == 1
+    assert [t["kept"] for t in timings] == [1, 0, 0, 0]
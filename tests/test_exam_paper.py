@@ -0,0 +1,22 @@
+import exam_paper
+
+def test_plan_parts_continues_numbering_within_section():
+    parts = exam_paper.plan_parts(5, 3, "Easy", 0, "Moderate", 2, "Difficult")
+    assert [(p["section"], p["start"], p["count"]) for p in parts] == [("A", 1, 5), ("A", 6, 3), ("C", 1, 2)]
+
+def test_exam_renumber():
+    text = "**Q1. First?**\n(A) one\n3) Second?\nQ.7: Third?"
+    out, found = exam_paper.renumber(text, 10)
+    assert found == 3
+    assert out.splitlines() == ["**Q10. First?**", "(A) one", "11) Second?", "Q.12: Third?"]
+
+def test_parse_part_splits_summary():
+    part = {"start": 4, "count": 2}
+    text = f"1. Alpha?\n2. Beta?\n{exam_paper.SUMMARY_MARKER}\n1. Unit 1\n2. Unit 2"
+    result = exam_paper.parse_part(text, part)
+    assert result == ("4. Alpha?\n5. Beta?", "4. Unit 1\n5. Unit 2", 2)
+    assert exam_paper.is_complete(result, part)
+
+def test_incomplete_part():
+    part = {"start": 1, "count": 3}
+    assert not exam_paper.is_complete(exam_paper.parse_part("1. Alpha?\n2. Beta?", part), part)
@@ -0,0 +1,36 @@
+import glob
+import io
+import os
+import fpdf.fpdf
+import pytest
+from pypdf import PdfReader
+import export
+
+needs_font = pytest.mark.skipif(export.unicode_font() is None, reason="no DejaVuSans.ttf installed")
+
+def text_of(data):
+    return PdfReader(io.BytesIO(data)).pages[0].extract_text()
+
+@needs_font
+def test_unicode_text_is_embedded():
+    assert "“quoted” ✓ café" in text_of(export.render_pdf("“quoted” ✓ café", "Title"))
+
+@needs_font
+def test_font_is_parsed_once(monkeypatch):
+    parsed = []
+    get_metrics = fpdf.fpdf.TTFontFile.getMetrics
+    monkeypatch.setattr(fpdf.fpdf.TTFontFile, "getMetrics", lambda self, path: parsed.append(path) or get_metrics(self, path))
+    export._font_template.cache_clear()
+    for n in range(3):
+        assert f"document {n}" in text_of(export.render_pdf(f"document {n}", "Title"))
+    assert len(parsed) == len([p for p in export.unicode_font() if p])
+    # No metrics pickles are written next to the system font
+    assert not glob.glob(os.path.join(os.path.dirname(export.unicode_font()[0]), "*.pkl"))
+
+def test_latin1_fallback():
+    assert export.to_latin1("“a” – b… ✓") == '"a" - b... '
+
+def test_create_pdf_is_memoized():
+    first = export.create_pdf("memo body", "Memo")
+    assert export.create_pdf("memo body", "Memo") is first
+    assert export.create_pdf("memo body", "Other") is not first
@@ -0,0 +1,71 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+import jobs
+
+release = threading.Event()
+
+@jobs.handler("test_echo")
+def run_echo(p, progress, cancel):
+    if p.get("wait"):
+        release.wait(5)
+    return {"text": p["text"]}
+
+def wait_for(job_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = jobs.get_job(job_id)
+        if job["state"] not in jobs.ACTIVE_STATES:
+            return job
+        time.sleep(0.01)
+    return jobs.get_job(job_id)
+
+def insert_job(state, owner, heartbeat):
+    return jobs._execute('INSERT INTO jobs (user, kind, payload, state, created, owner, heartbeat) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                         ("u", "test_echo", '{"text": "orphan"}', state, time.time(), owner, heartbeat)).lastrowid
+
+def test_submitted_job_runs_under_this_process():
+    job = wait_for(jobs.submit_job("u", "test_echo", {"text": "hi"}))
+    assert job["state"] == jobs.DONE and job["result"] == {"text": "hi"}
+    assert job["owner"] == jobs.OWNER
+
+def test_only_jobs_of_dead_owners_are_reclaimed():
+    pool = jobs._get_pool()
+    live = insert_job(jobs.RUNNING, "other:1:live", time.time())
+    dead = insert_job(jobs.RUNNING, "other:2:dead", time.time() - jobs.OWNER_TIMEOUT - 1)
+    claimed = jobs.reclaim_orphans(pool)
+    assert live not in claimed and dead in claimed
+    assert wait_for(dead)["state"] == jobs.DONE
+    job = jobs.get_job(live)
+    assert job["state"] == jobs.RUNNING and job["owner"] == "other:1:live"
+
+def test_job_taken_over_is_not_finished_by_old_owner():
+    release.clear()
+    job_id = jobs.submit_job("u", "test_echo", {"text": "slow", "wait": True})
+    while jobs.get_job(job_id)["state"] != jobs.RUNNING:
+        time.sleep(0.01)
+    jobs._execute('UPDATE jobs SET owner=? WHERE id=?', ("other:3:new", job_id))
+    release.set()
+    time.sleep(0.2)
+    job = jobs.get_job(job_id)
+    assert job["state"] == jobs.RUNNING and job["result"] is None
+
+def test_importing_tasks_claims_nothing(tmp_path):
+    # A script or worker process that imports the handlers must not touch live jobs
+    repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = "import tasks, jobs; print(jobs._pool is None)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=tmp_path, capture_output=True, text=True,
+                         env=dict(os.environ, PYTHONPATH=repo), check=True)
+    assert out.stdout.strip() == "True"
+
+def test_owner_columns_added_to_old_table(tmp_path, monkeypatch):
+    path = str(tmp_path / "old.db")
+    conn = jobs.storage.connect(path)
+    with conn:
+        conn.execute('''CREATE TABLE jobs (id INTEGER PRIMARY KEY AUTOINCREMENT, user TEXT, kind TEXT, payload TEXT,
+                        state TEXT, partial TEXT, result TEXT, error TEXT, created REAL, started REAL, finished REAL)''')
+    monkeypatch.setattr(jobs, "JOBS_DB", path)
+    jobs.init_jobs()
+    assert {"owner", "heartbeat"} <= {row[1] for row in conn.execute('PRAGMA table_info(jobs)')}
@@ -0,0 +1,52 @@
+import contextvars
+import time
+import pytest
+import metrics
+
+def wait_for(predicate, timeout=5):
+    # Spans are written by a background thread about once per FLUSH_INTERVAL
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        result = predicate()
+        if result:
+            return result
+        time.sleep(0.05)
+    return predicate()
+
+def rows(op):
+    c = metrics.init_metrics().cursor()
+    c.execute('SELECT tab, ok, error, response_chars, cache, extra FROM spans WHERE op=?', (op,))
+    return c.fetchall()
+
+def test_span_records_attributes():
+    with metrics.span("test.attrs", prompt_chars=3) as span:
+        span["response_chars"] = 42
+        span["cache"] = "miss"
+        span["pages"] = 7
+    (row,) = wait_for(lambda: rows("test.attrs"))
+    assert row[1:] == (1, None, 42, "miss", '{"pages": 7}')
+
+def test_span_records_errors():
+    with pytest.raises(ValueError):
+        with metrics.span("test.error"):
+            raise ValueError("boom")
+    (row,) = wait_for(lambda: rows("test.error"))
+    assert row[1] == 0 and row[2] == "ValueError: boom"
+    assert any(e["operation"] == "test.error" for e in metrics.recent_errors())
+
+def test_tab_follows_the_context():
+    def in_tab():
+        metrics.set_tab("Slides")
+        metrics.record("test.tab", 1.0)
+
+    contextvars.copy_context().run(in_tab)
+    metrics.record("test.tab", 1.0)
+    assert sorted(wait_for(lambda: len(rows("test.tab")) == 2 and rows("test.tab")), key=str) == \
+        sorted([("Slides", 1, None, None, None, None), (None, 1, None, None, None, None)], key=str)
+
+def test_summary_reports_cache_hit_rate():
+    for cache in ("hit", "hit", "miss", None):
+        metrics.record("test.summary", 10.0, cache=cache)
+    report = wait_for(lambda: [r for r in metrics.summarize() if r["operation"] == "test.summary" and r["calls"] == 4])
+    assert report[0]["cache_hit_rate"] == pytest.approx(2 / 3, abs=1e-3)
+    assert report[0]["p50_ms"] == 10.0
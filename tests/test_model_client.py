@@ -0,0 +1,63 @@
+import threading
+import time
+import pytest
+import model_client
+
+def test_cache_hit(fake):
+    a = model_client.generate("hit prompt", "m")
+    b = model_client.generate("hit   prompt ", "m")
+    assert a == b and fake.calls == 1
+
+def test_context_hash_separates_entries(fake):
+    model_client.generate("doc prompt", "m", context_hash="a")
+    model_client.generate("doc prompt", "m", context_hash="b")
+    assert fake.calls == 2
+
+def test_single_flight(fake):
+    # Slow enough that all callers arrive while the first request is in flight
+    fake.latency = 0.05
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(model_client.generate("shared prompt", "m", use_cache=False)))
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(set(results)) == 1 and len(results) == 8
+    assert fake.calls == 1
+
+def test_refresh_replaces_entry(fake):
+    model_client.generate("refresh prompt", "m")
+    model_client.generate("refresh prompt", "m", refresh=True)
+    assert fake.calls == 2
+    model_client.generate("refresh prompt", "m")
+    assert fake.calls == 2
+
+def test_rejected_response_not_cached(fake):
+    model_client.generate("rejected prompt", "m", accept=lambda text: False)
+    model_client.generate("rejected prompt", "m")
+    assert fake.calls == 2
+
+def test_stream_uses_cache(fake):
+    first = "".join(model_client.generate_stream("stream prompt", "m"))
+    assert model_client.generate("stream prompt", "m") == first
+    assert fake.calls == 1
+
+def test_ttl_expiry(fake, monkeypatch):
+    model_client.generate("ttl prompt", "m")
+    key = model_client.cache_key("m", "ttl prompt")
+    monkeypatch.setattr(model_client, "CACHE_TTL_SECONDS", 60)
+    monkeypatch.setattr(model_client.time, "time", lambda: time.monotonic() + 10 ** 10)
+    assert model_client.cache_get(key) is None
+
+def test_lru_eviction(fake, monkeypatch):
+    monkeypatch.setattr(model_client, "MAX_CACHE_ENTRIES", 2)
+    for name in ("lru a", "lru b"):
+        model_client.cache_put(model_client.cache_key("m", name), "m", name)
+        time.sleep(0.01)
+    # Reading "lru a" makes "lru b" the least recently used
+    assert model_client.cache_get(model_client.cache_key("m", "lru a")) == "lru a"
+    time.sleep(0.01)
+    model_client.cache_put(model_client.cache_key("m", "lru c"), "m", "lru c")
+    assert model_client.cache_get(model_client.cache_key("m", "lru b")) is None
+    assert model_client.cache_get(model_client.cache_key("m", "lru a")) == "lru a"
@@ -0,0 +1,68 @@
+import threading
+import pytest
+import pdf_cache
+from benchmarks.bench_flows import Upload, make_syllabus_pdf
+
+@pytest.fixture
+def counted_parses(monkeypatch):
+    # Counts real parses; the delay keeps a concurrent upload waiting on the first
+    calls = []
+    iter_pages = pdf_cache.iter_pages
+
+    def slow_iter_pages(data, progress=None):
+        calls.append(1)
+        for page in iter_pages(data, progress=progress, workers=1):
+            threading.Event().wait(0.01)
+            yield page
+
+    monkeypatch.setattr(pdf_cache, "iter_pages", slow_iter_pages)
+    return calls
+
+def test_reupload_skips_parsing(counted_parses):
+    data = make_syllabus_pdf(3, seed=101)
+    doc_hash = pdf_cache.ingest_pdf(Upload("a.pdf", data))
+    assert pdf_cache.ingest_pdf(Upload("b.pdf", data)) == doc_hash
+    assert len(counted_parses) == 1
+    assert len(pdf_cache.load_pages(doc_hash)) == 3
+
+def test_concurrent_uploads_parse_once(counted_parses):
+    data = make_syllabus_pdf(10, seed=102)
+    results, errors = [], []
+
+    def upload():
+        try:
+            results.append(pdf_cache.ingest_pdf(Upload("same.pdf", data)))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=upload) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors and len(set(results)) == 1
+    assert len(counted_parses) == 1
+    assert len(pdf_cache.load_pages(results[0])) == 10
+
+def test_incomplete_entry_is_parsed_again(counted_parses):
+    data = make_syllabus_pdf(4, seed=103)
+    doc_hash = pdf_cache.ingest_pdf(Upload("a.pdf", data))
+    conn = pdf_cache._connect()
+    with conn:
+        conn.execute('DELETE FROM pages WHERE hash=? AND page_no >= 2', (doc_hash,))
+    assert pdf_cache.load_pages(doc_hash) is None
+    pdf_cache.ingest_pdf(Upload("a.pdf", data))
+    assert len(counted_parses) == 2
+    assert len(pdf_cache.load_pages(doc_hash)) == 4
+
+def test_lru_eviction(monkeypatch):
+    docs = [pdf_cache.ingest_pdf(Upload(f"{n}.pdf", make_syllabus_pdf(2, seed=110 + n))) for n in range(3)]
+    sizes = [pdf_cache.document_info(d)["size_bytes"] for d in docs]
+    # Touch the oldest so the second one becomes least recently used
+    pdf_cache.load_pages(docs[0])
+    monkeypatch.setattr(pdf_cache, "MAX_CACHE_BYTES", sum(sizes) - 1)
+    newest = pdf_cache.ingest_pdf(Upload("new.pdf", make_syllabus_pdf(2, seed=120)))
+    assert pdf_cache.document_info(docs[1]) is None
+    assert pdf_cache.load_pages(docs[1]) is None
+    assert pdf_cache.document_info(docs[0]) is not None
+    assert pdf_cache.document_info(newest) is not None
@@ -0,0 +1,27 @@
+import sys
+import types
+import pytest
+import pdf_extract
+from benchmarks.bench_flows import make_syllabus_pdf
+
+@pytest.fixture(scope="module")
+def pdf():
+    return make_syllabus_pdf(pdf_extract.PARALLEL_MIN_PAGES + 16)
+
+def test_parallel_matches_serial(pdf):
+    serial = list(pdf_extract.iter_pages(pdf, workers=1))
+    assert [n for n, _ in serial] == list(range(len(serial)))
+    assert list(pdf_extract.iter_pages(pdf, workers=2)) == serial
+
+def test_workers_do_not_run_the_app_script(pdf, tmp_path, monkeypatch):
+    # Streamlit runs the app as a synthetic __main__ whose __file__ is the script
+    marker = tmp_path / "ran"
+    script = tmp_path / "app.py"
+    script.write_text(f"open({str(marker)!r}, 'a').write('x')\n")
+    app = types.ModuleType("__main__")
+    app.__file__ = str(script)
+    monkeypatch.setitem(sys.modules, "__main__", app)
+    pages = list(pdf_extract.iter_pages(pdf, workers=2))
+    assert len(pages) == pdf_extract.PARALLEL_MIN_PAGES + 16
+    assert not marker.exists()
+    assert sys.modules["__main__"] is app
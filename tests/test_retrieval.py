@@ -0,0 +1,58 @@
+import pdf_cache
+import retrieval
+from benchmarks.bench_flows import Upload, make_syllabus_pdf
+
+TEXT = "\n".join([
+    "Unit 1: Thermodynamics covers heat, work and entropy.",
+    "Unit 2: Kinematics covers velocity and acceleration.",
+    "Unit 3: Genetics covers inheritance and DNA.",
+] * 3)
+
+def small_index():
+    # One line per chunk so each unit can be selected on its own
+    chunks = TEXT.splitlines()[:3]
+    return retrieval.ChunkIndex.build("\n".join(c + " " + "x" * 450 for c in chunks))
+
+def test_chunk_text_respects_size():
+    chunks = retrieval.chunk_text("word " * 1000, size=100)
+    assert all(len(c) <= 100 for c in chunks)
+    assert " ".join(chunks).split() == ["word"] * 1000
+
+def test_select_ranks_matching_chunk():
+    index = small_index()
+    picked = index.select("what is entropy", budget_tokens=index.chunk_tokens.max())
+    assert len(picked) == 1 and "Thermodynamics" in index.chunks[picked[0]]
+
+def test_select_stays_within_budget():
+    index = small_index()
+    budget = int(index.chunk_tokens[:2].sum())
+    picked = index.select("covers", budget)
+    assert len(picked) == 2 and int(index.chunk_tokens[picked].sum()) <= budget
+
+def test_select_without_matches_falls_back_to_coverage():
+    index = small_index()
+    assert index.select("quantum", 10 ** 6) == [0, 1, 2]
+    assert index.select("", 10 ** 6) == [0, 1, 2]
+
+def test_context_joins_in_document_order():
+    index = small_index()
+    context = index.context("DNA velocity", 10 ** 6)
+    assert context.index("Kinematics") < context.index("Genetics")
+
+def test_row_round_trip():
+    index = retrieval.ChunkIndex.build(TEXT)
+    copy = retrieval.ChunkIndex.from_row(*index.to_row())
+    assert copy.chunks == index.chunks
+    assert copy.select("entropy", 500) == index.select("entropy", 500)
+
+def test_persisted_index_counts_towards_cache_size(monkeypatch):
+    old = pdf_cache.ingest_pdf(Upload("old.pdf", make_syllabus_pdf(3, seed=201)))
+    retrieval.get_index(old)
+    new = pdf_cache.ingest_pdf(Upload("new.pdf", make_syllabus_pdf(3, seed=202)))
+    # Both documents' text fits, but not together with their indexes
+    text_bytes = pdf_cache.document_info(old)["size_bytes"] + pdf_cache.document_info(new)["size_bytes"]
+    monkeypatch.setattr(pdf_cache, "MAX_CACHE_BYTES", text_bytes + 1)
+    retrieval.get_index(new)
+    assert pdf_cache.document_info(old) is None
+    assert pdf_cache.load_index_row(old) is None
+    assert pdf_cache.load_index_row(new) is not None
@@ -0,0 +1,72 @@
+import threading
+import pytest
+import fake_model
+import scheduler
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_token_bucket_refill():
+    clock = FakeClock()
+    bucket = scheduler.TokenBucket(60, clock=clock)
+    assert bucket.delay_for(60) == 0.0
+    bucket.consume(60)
+    assert bucket.delay_for(1) == pytest.approx(1.0)
+    clock.now = 30.0
+    assert bucket.delay_for(30) == 0.0
+    assert bucket.delay_for(31) == pytest.approx(1.0)
+
+def test_token_bucket_oversized_request():
+    bucket = scheduler.TokenBucket(60, clock=FakeClock())
+    bucket.consume(60)
+    # Larger than the bucket: waits for a full bucket, not forever
+    assert bucket.delay_for(1000) == pytest.approx(60.0)
+
+def test_interactive_runs_before_bulk():
+    s = scheduler.Scheduler(requests_per_minute=10 ** 9, tokens_per_minute=10 ** 12, workers=1)
+    started, release, order = threading.Event(), threading.Event(), []
+
+    def block():
+        started.set()
+        release.wait()
+
+    s.submit(block)
+    started.wait()
+    futs = [s.submit(order.append, "bulk", priority=scheduler.BULK),
+            s.submit(order.append, "interactive", priority=scheduler.INTERACTIVE)]
+    release.set()
+    for f in futs:
+        f.result(timeout=5)
+    assert order == ["interactive", "bulk"]
+
+def test_retries_quota_errors(monkeypatch):
+    monkeypatch.setattr(scheduler, "BACKOFF_BASE", 0.01)
+    model = fake_model.FakeModel(fail_first=2)
+    s = scheduler.Scheduler(requests_per_minute=10 ** 9, tokens_per_minute=10 ** 12)
+    assert s.call(model, "m", "prompt") == model.respond("prompt")
+    assert model.calls == 3 and s.stats()["retries"] == 2
+
+def test_gives_up_with_busy_error(monkeypatch):
+    monkeypatch.setattr(scheduler, "BACKOFF_BASE", 0.01)
+    model = fake_model.FakeModel(fail_first=10)
+    s = scheduler.Scheduler(requests_per_minute=10 ** 9, tokens_per_minute=10 ** 12, max_retries=2)
+    with pytest.raises(scheduler.ModelBusyError) as info:
+        s.call(model, "m", "prompt")
+    assert isinstance(info.value.__cause__, fake_model.QuotaExceeded)
+    assert model.calls == 3
+
+def test_other_errors_not_retried():
+    s = scheduler.Scheduler(requests_per_minute=10 ** 9, tokens_per_minute=10 ** 12)
+    calls = []
+
+    def broken():
+        calls.append(1)
+        raise ValueError("bad prompt")
+
+    with pytest.raises(ValueError):
+        s.call(broken)
+    assert len(calls) == 1
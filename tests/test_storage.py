@@ -0,0 +1,30 @@
+import pytest
+import storage
+
+@pytest.fixture(scope="module")
+def user():
+    storage.init_db()
+    storage.save_materials([
+        ("fts_user", "a.pdf", "Thermodynamics quiz", "Questions about entropy and heat", "Assessment"),
+        ("fts_user", "a.pdf", "Kinematics plan", "Velocity \"and\" acceleration: NEAR(AND)", "Lesson Plan"),
+        ("other_user", "b.pdf", "Thermodynamics quiz", "Entropy again", "Assessment"),
+    ])
+    return "fts_user"
+
+def topics(rows):
+    return [r[1] for r in rows]
+
+def test_search_matches_content(user):
+    assert topics(storage.search_materials(user, "entropy")) == ["Thermodynamics quiz"]
+
+@pytest.mark.parametrize("query", ['"velocity', 'velocity AND', 'NEAR(velocity', 'velocity*', 'acceleration: -(velocity)'])
+def test_search_escapes_fts_syntax(user, query):
+    assert "Kinematics plan" in topics(storage.search_materials(user, query))
+
+def test_search_only_punctuation_lists_all(user):
+    assert len(storage.search_materials(user, '"*()')) == 2
+
+def test_load_material_round_trip(user):
+    material_id = storage.list_materials(user)[0][0]
+    assert storage.load_material(user, material_id) == "Velocity \"and\" acceleration: NEAR(AND)"
+    assert storage.load_material("other_user", material_id) is None
@@ -0,0 +1,56 @@
+import io
+import os
+import wave
+import pytest
+import tts
+
+class CountingEngine(tts.SilentEngine):
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def synthesize(self, text, lang):
+        self.calls.append(text)
+        return super().synthesize(text, lang)
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    monkeypatch.setattr(tts, "TTS_CACHE_DIR", str(tmp_path / "tts"))
+    monkeypatch.setattr(tts, "_cache_bytes", None)
+    return CountingEngine()
+
+def frames(audio):
+    with wave.open(io.BytesIO(audio), 'rb') as w:
+        return w.getnframes()
+
+def test_split_sentences_bounds_chunks():
+    text = "Short one. " + "word " * 300 + "\n\nNext paragraph!"
+    chunks = tts.split_sentences(text, max_chars=100)
+    assert all(len(c) <= 100 for c in chunks)
+    assert " ".join(chunks).split() == text.split()
+
+def test_segments_start_small_and_cover_all_chunks(engine):
+    text = " ".join(f"Sentence number {n} is here." for n in range(200))
+    chunks = tts.split_sentences(text)
+    segments = list(tts.iter_segments(text, engine=engine, segment_chars=2000))
+    assert frames(segments[0]) == frames(engine.synthesize(chunks[0], "en"))
+    assert len(segments) < len(chunks) // 3
+    assert sum(frames(s) for s in segments) == sum(frames(engine.synthesize(c, "en")) for c in chunks)
+
+def test_cached_audio_is_reused(engine):
+    first = tts.synthesize_cached("Hello there.", "en", engine)
+    assert tts.synthesize_cached("Hello there.", "en", engine) == first
+    assert engine.calls == ["Hello there."]
+
+def test_eviction_keeps_cache_under_limit(engine, monkeypatch):
+    size = len(engine.synthesize("x" * 50, "en"))
+    monkeypatch.setattr(tts, "MAX_TTS_CACHE_BYTES", size * 3)
+    for n in range(6):
+        tts.synthesize_cached(f"{n}" * 50, "en", engine)
+        # mtime is the LRU clock; space the writes so their order is unambiguous
+        path = tts._cache_path(engine, f"{n}" * 50, "en")
+        os.utime(path, (n, n))
+    on_disk = sum(os.path.getsize(os.path.join(tts.TTS_CACHE_DIR, f)) for f in os.listdir(tts.TTS_CACHE_DIR))
+    assert on_disk <= size * 3
+    assert tts._cache_bytes == on_disk
+    assert os.path.exists(tts._cache_path(engine, "5" * 50, "en"))
@@ -0,0 +1,20 @@
+import tutor
+
+def test_compact_folds_oldest_turns(fake):
+    conv = tutor.Conversation(history_tokens=100)
+    for n in range(5):
+        conv.add_turn(f"question {n}", "answer " * 30, "m", wait=True)
+    assert conv.summary
+    assert conv._turns_tokens(conv.turns) <= 100
+    assert conv.turns[-1][0] == "question 4"
+
+def test_compact_failure_keeps_turns(monkeypatch):
+    def broken(*args, **kwargs):
+        raise RuntimeError("model down")
+
+    monkeypatch.setattr(tutor, "generate", broken)
+    conv = tutor.Conversation(history_tokens=100)
+    for n in range(5):
+        conv.add_turn(f"question {n}", "answer " * 30, "m", wait=True)
+    assert [q for q, _ in conv.turns] == [f"question {n}" for n in range(5)]
+    assert conv.summary == "" and not conv._folding
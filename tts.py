@@ -0,0 +1,220 @@
+import hashlib
+import io
+import os
+import re
+import struct
+import contextvars
+import threading
+import wave
+from concurrent.futures import ThreadPoolExecutor
+import metrics
+
+# Text-to-speech for archive items: the full text is split into sentence-sized
+# chunks that are synthesized in parallel and yielded in order. For playback
+# they are joined into a short first segment, so listening starts quickly, and
+# a few long segments after it. Audio is cached on disk by (engine, lang, text)
+# with least-recently-used eviction.
+TTS_CACHE_DIR = 'tts_cache'
+MAX_TTS_CACHE_BYTES = 256 * 1024 * 1024
+TTS_CHUNK_CHARS = 400
+TTS_WORKERS = 4
+SEGMENT_CHARS = 4000
+
+_evict_lock = threading.Lock()
+_cache_bytes = None  # running size of TTS_CACHE_DIR, measured on first write
+
+# --- 1. ENGINES ---
+class GTTSEngine:
+    name = "gtts"
+    fmt = "mp3"
+    mime = "audio/mpeg"
+
+    def synthesize(self, text, lang):
+        from gtts import gTTS
+        buf = io.BytesIO()
+        gTTS(text, lang=lang).write_to_fp(buf)
+        return buf.getvalue()
+
+class LocalEngine:
+    # Offline synthesis through pyttsx3 (espeak/SAPI/NSSpeech), for networks without Google access
+    name = "local"
+    fmt = "wav"
+    mime = "audio/wav"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def synthesize(self, text, lang):
+        import tempfile
+        import pyttsx3
+        fd, path = tempfile.mkstemp(suffix=".wav")
+        os.close(fd)
+        try:
+            # pyttsx3 drivers are not thread-safe, so local synthesis is serialized
+            with self._lock:
+                engine = pyttsx3.init()
+                engine.save_to_file(text, path)
+                engine.runAndWait()
+            with open(path, 'rb') as f:
+                return f.read()
+        finally:
+            os.remove(path)
+
+class SilentEngine:
+    # Produces silent WAV audio sized to the text; for tests and benchmarks
+    name = "silent"
+    fmt = "wav"
+    mime = "audio/wav"
+
+    def __init__(self, rate=8000, seconds_per_char=0.01):
+        self.rate = rate
+        self.seconds_per_char = seconds_per_char
+
+    def synthesize(self, text, lang):
+        frames = int(len(text) * self.seconds_per_char * self.rate)
+        header = struct.pack('<4sI4s4sIHHIIHH4sI', b'RIFF', 36 + frames, b'WAVE', b'fmt ', 16, 1, 1,
+                             self.rate, self.rate, 1, 8, b'data', frames)
+        return header + b'\x80' * frames
+
+ENGINES = {"gtts": GTTSEngine, "local": LocalEngine, "silent": SilentEngine}
+_engine = None
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        _engine = ENGINES[os.environ.get("TTS_ENGINE", "gtts")]()
+    return _engine
+
+def set_engine(engine):
+    global _engine
+    _engine = engine
+
+# --- 2. CHUNKING ---
+def split_sentences(text, max_chars=TTS_CHUNK_CHARS):
+    sentences = re.split(r"(?<=[.!?])\s+|\n{2,}", text)
+    chunks, buf = [], ""
+    for sentence in sentences:
+        sentence = " ".join(sentence.split())
+        if not sentence:
+            continue
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            if buf:
+                chunks.append(buf)
+                buf = ""
+            chunks.append(sentence[:cut])
+            sentence = sentence[cut:].strip()
+        if buf and len(buf) + len(sentence) + 1 > max_chars:
+            chunks.append(buf)
+            buf = ""
+        buf = f"{buf} {sentence}" if buf else sentence
+    if buf:
+        chunks.append(buf)
+    return chunks
+
+# --- 3. CACHE ---
+def _cache_path(engine, text, lang):
+    key = hashlib.sha256("\0".join([engine.name, lang, text]).encode('utf-8')).hexdigest()
+    return os.path.join(TTS_CACHE_DIR, f"{key}.{engine.fmt}")
+
+def _note_written(size):
+    # The directory is only listed on the first write and when the limit is passed
+    global _cache_bytes
+    with _evict_lock:
+        if _cache_bytes is not None:
+            _cache_bytes += size
+            if _cache_bytes <= MAX_TTS_CACHE_BYTES:
+                return
+    _evict()
+
+def _evict(max_bytes=None):
+    global _cache_bytes
+    max_bytes = MAX_TTS_CACHE_BYTES if max_bytes is None else max_bytes
+    with _evict_lock:
+        entries = []
+        for name in os.listdir(TTS_CACHE_DIR):
+            if name.endswith(".tmp"):
+                continue
+            path = os.path.join(TTS_CACHE_DIR, name)
+            try:
+                info = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((info.st_mtime, info.st_size, path))
+        total = sum(e[1] for e in entries)
+        for _, size, path in sorted(entries):
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except FileNotFoundError:
+                pass
+        _cache_bytes = total
+
+def synthesize_cached(text, lang, engine=None):
+    engine = engine or get_engine()
+    path = _cache_path(engine, text, lang)
+    try:
+        with open(path, 'rb') as f:
+            audio = f.read()
+        os.utime(path)  # mtime doubles as the LRU timestamp
+        metrics.record("tts.synthesize", 0.0, prompt_chars=len(text), response_chars=len(audio), cache="hit", engine=engine.name)
+        return audio
+    except FileNotFoundError:
+        pass
+    with metrics.span("tts.synthesize", prompt_chars=len(text), cache="miss", engine=engine.name) as span:
+        audio = engine.synthesize(text, lang)
+        span["response_chars"] = len(audio)
+    os.makedirs(TTS_CACHE_DIR, exist_ok=True)
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(audio)
+    os.replace(tmp, path)
+    _note_written(len(audio))
+    return audio
+
+# --- 4. PIPELINE ---
+def iter_audio(text, lang='en', engine=None, workers=TTS_WORKERS):
+    # Yields (chunk_text, audio_bytes) in reading order while later chunks are still synthesizing
+    engine = engine or get_engine()
+    chunks = split_sentences(text)
+    if not chunks:
+        return
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(chunks)))) as pool:
+        # Each task runs in a copy of the caller's context so spans keep the caller's tab
+        futures = [pool.submit(contextvars.copy_context().run, synthesize_cached, chunk, lang, engine)
+                   for chunk in chunks]
+        try:
+            for chunk, fut in zip(chunks, futures):
+                yield chunk, fut.result()
+        finally:
+            for fut in futures:
+                fut.cancel()
+
+def join_audio(engine, audios):
+    # MP3 frames can simply be concatenated; WAV clips are re-wrapped under one header
+    if engine.fmt != "wav":
+        return b"".join(audios)
+    out = io.BytesIO()
+    with wave.open(out, 'wb') as dst:
+        for n, audio in enumerate(audios):
+            with wave.open(io.BytesIO(audio), 'rb') as src:
+                if n == 0:
+                    dst.setparams(src.getparams())
+                dst.writeframes(src.readframes(src.getnframes()))
+    return out.getvalue()
+
+def iter_segments(text, lang='en', engine=None, workers=TTS_WORKERS, segment_chars=SEGMENT_CHARS):
+    # Yields playable audio: the first chunk on its own, then segments of about segment_chars
+    engine = engine or get_engine()
+    audios, chars, first = [], 0, True
+    for chunk, audio in iter_audio(text, lang, engine, workers):
+        audios.append(audio)
+        chars += len(chunk)
+        if first or chars >= segment_chars:
+            yield join_audio(engine, audios)
+            audios, chars, first = [], 0, False
+    if audios:
+        yield join_audio(engine, audios)
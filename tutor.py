@@ -0,0 +1,112 @@
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from model_client import generate, generate_stream
+from retrieval import estimate_tokens
+from scheduler import INTERACTIVE
+
+# Multi-turn tutor. Each prompt is laid out stable-part-first: instructions,
+# then the running summary of older turns, then the last few turns verbatim,
+# and only then the chunks retrieved for this question. Consecutive prompts
+# therefore share a long common prefix, which Gemini's implicit context
+# caching reuses. When the verbatim turns outgrow HISTORY_TOKENS, the oldest
+# are folded into the summary in the background, so prompt size stays flat
+# however long the conversation runs.
+CONTEXT_TOKENS = 1000
+HISTORY_TOKENS = 800
+SUMMARY_TOKENS = 250
+FOLD_WORKERS = 2
+
+_fold_pool = ThreadPoolExecutor(max_workers=FOLD_WORKERS, thread_name_prefix="tutor-fold")
+
+INSTRUCTIONS = (
+    "You are a patient university tutor helping a teacher with their course syllabus.\n"
+    "Answer using the syllabus excerpts provided. If they do not cover the question, say so briefly "
+    "and answer from general knowledge. Keep answers focused and use the conversation so far to "
+    "resolve follow-up questions."
+)
+
+class Conversation:
+    def __init__(self, history_tokens=HISTORY_TOKENS, summary_tokens=SUMMARY_TOKENS):
+        self.history_tokens = history_tokens
+        self.summary_tokens = summary_tokens
+        self.summary = ""
+        self.turns = []  # verbatim (question, answer) pairs since the last fold
+        self._lock = threading.Lock()
+        self._folding = False
+
+    def prefix(self):
+        # The part of the prompt that only changes when turns are folded or appended
+        with self._lock:
+            summary, turns = self.summary, list(self.turns)
+        parts = [INSTRUCTIONS]
+        if summary:
+            parts.append(f"Summary of the earlier conversation:\n{summary}")
+        if turns:
+            parts.append("Recent conversation:\n" + "\n".join(f"Teacher: {q}\nTutor: {a}" for q, a in turns))
+        return "\n\n".join(parts)
+
+    def retrieval_query(self, question):
+        # The previous question is included so short follow-ups ("and the second one?") still retrieve well
+        with self._lock:
+            return f"{self.turns[-1][0]} {question}" if self.turns else question
+
+    def prompt(self, question, index, context_tokens=CONTEXT_TOKENS):
+        context = index.context(self.retrieval_query(question), context_tokens)
+        return f"{self.prefix()}\n\nSyllabus excerpts:\n{context}\n\nTeacher: {question}\nTutor:"
+
+    def summary_prompt(self, turns):
+        transcript = "\n".join(f"Teacher: {q}\nTutor: {a}" for q, a in turns)
+        return (
+            f"Update the running summary of a tutoring conversation. Keep the topics covered, definitions "
+            f"given and anything the teacher asked to remember. Use at most {self.summary_tokens * 3 // 4} words.\n\n"
+            f"Current summary:\n{self.summary or '(none)'}\n\nNew turns:\n{transcript}\n\nUpdated summary:"
+        )
+
+    def stream(self, question, index, model_name, context_tokens=CONTEXT_TOKENS, context_hash="", cancel=None):
+        return generate_stream(self.prompt(question, index, context_tokens), model_name,
+                               context_hash=context_hash, cancel=cancel, priority=INTERACTIVE)
+
+    def add_turn(self, question, answer, model_name, wait=False):
+        # Folding runs on a background thread so it never delays the reply or the
+        # next rerun; wait=True blocks until it is done (benchmarks, tests).
+        with self._lock:
+            self.turns.append((question, answer))
+            if self._folding or self._turns_tokens(self.turns) <= self.history_tokens:
+                return
+            self._folding = True
+        fut = _fold_pool.submit(contextvars.copy_context().run, self._fold_in_background, model_name)
+        if wait:
+            fut.result()
+
+    def _fold_in_background(self, model_name):
+        try:
+            self.compact(model_name)
+        finally:
+            with self._lock:
+                self._folding = False
+
+    @staticmethod
+    def _turns_tokens(turns):
+        return sum(estimate_tokens(q) + estimate_tokens(a) for q, a in turns)
+
+    def compact(self, model_name):
+        # Returns True if turns were folded. The turns are only dropped once the
+        # summary call succeeds; on failure they stay verbatim and a later turn retries.
+        with self._lock:
+            turns = list(self.turns)
+        if self._turns_tokens(turns) <= self.history_tokens:
+            return False
+        # Fold down to half the window so a fold happens every few turns, not every turn
+        n = 1
+        while n < len(turns) and self._turns_tokens(turns[n:]) > self.history_tokens // 2:
+            n += 1
+        try:
+            summary = generate(self.summary_prompt(turns[:n]), model_name, priority=INTERACTIVE).strip()
+        except Exception:
+            return False
+        with self._lock:
+            del self.turns[:n]
+            # The model is asked for a bounded summary; the cut guarantees it
+            self.summary = summary[:self.summary_tokens * 4]
+        return True